@@ -0,0 +1,16 @@
+import os
+
+from survey_analysis import read_survey, load_simulations, summarize_simulations, plot_confidence_duration
+
+
+"""
+Plots the mean reviewer confidence of every simulation against its duration. The means are
+computed from the survey export, and the type and duration of the simulations are read from
+simulations.csv, see survey_analysis.py for the full analysis.
+"""
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+df = read_survey(os.path.join(script_dir, "thesis-evaluation-results.csv"))
+summary = summarize_simulations(df, load_simulations(os.path.join(script_dir, "simulations.csv")))
+print(summary[["simulation", "type", "duration_sec", "confidence"]].round(2).to_string(index=False))
+plot_confidence_duration(summary, os.path.join(script_dir, "confidence_duration_boxplot.png"))
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import os
+import re
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+
+"""
+Analysis of the survey in which reviewers judged whether each simulation was made by a human or
+an AI. The export stores every simulation as a repeated group of columns in one wide row per
+respondent. This script streams the rows into a long table with one typed row per respondent and
+simulation (label, confidence, human-likeness, experience and every multi-select option as a
+boolean column), aggregates it with pandas and draws the plots from it. The ground truth and
+duration of the simulations are read from simulations.csv.
+
+The column groups are found by their questions, so exports with more respondents, simulations
+or options need no code changes.
+
+Run with:
+python survey_analysis.py thesis-evaluation-results.csv --simulations simulations.csv --output-dir results
+"""
+
+# question of each field of a simulation group, matched case-insensitively against the header
+QUESTIONS = {
+    "label": "who made this simulation",
+    "confidence": "how confident are you",
+    "human_likeness": "how human-like",
+    "experience": "how experienced",
+    "traits": "personality traits",
+    "reasons": "what made you choose",
+}
+MULTI_SELECT = ("traits", "reasons")
+# options are separated by ";", except inside parentheses as in "Meticulous (=...; very careful ...)"
+OPTION_SEPARATOR = re.compile(r";(?![^()]*\))")
+
+
+def column_groups(header):
+    """Map every simulation to the column index of each of its fields."""
+    groups = []
+    for index, name in enumerate(header):
+        name = name.strip().lower()
+        for field, question in QUESTIONS.items():
+            if question in name:
+                if field == "label" or not groups:
+                    groups.append({})
+                groups[-1][field] = index
+                break
+    return groups
+
+
+def option_name(option):
+    """Short column name of a multi-select option, e.g. "Meticulous (=...)" -> "meticulous"."""
+    option = option.split("(")[0].strip().lower()
+    return re.sub(r"[^a-z0-9]+", "_", option).strip("_")
+
+
+def read_survey(path, min_option_count=2):
+    """
+    Stream the wide survey export into a long DataFrame with one row per respondent and simulation.
+    Multi-select options chosen fewer than `min_option_count` times are merged into an "other" column.
+    """
+    columns = {name: [] for name in ("respondent", "timestamp", "simulation", *QUESTIONS)}
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        groups = column_groups(header)
+        for respondent, row in enumerate(reader, start=1):
+            for number, group in enumerate(groups, start=1):
+                columns["respondent"].append(respondent)
+                columns["timestamp"].append(row[0])
+                columns["simulation"].append(f"S{number:02d}")
+                for field in QUESTIONS:
+                    value = row[group[field]].strip() if field in group and group[field] < len(row) else ""
+                    if field in MULTI_SELECT:
+                        value = "\x1f".join(option_name(o) for o in OPTION_SEPARATOR.split(value) if o.strip())
+                    columns[field].append(value)
+
+    df = pd.DataFrame(columns)
+    simulations = [f"S{number:02d}" for number in range(1, len(groups) + 1)]
+    df["simulation"] = pd.Categorical(df["simulation"], categories=simulations, ordered=True)
+    df["timestamp"] = pd.to_datetime(df["timestamp"].str.rsplit(" ", n=1).str[0],
+                                     format="%Y/%m/%d %I:%M:%S %p", errors="coerce")
+    df["label"] = df["label"].replace("", pd.NA).astype("category")
+    for field in ("confidence", "human_likeness"):
+        df[field] = pd.to_numeric(df[field], errors="coerce").astype("Int8")
+    # keep the level of "Very experienced – seemed confident, ..."
+    df["experience"] = df["experience"].str.split(" – ").str[0].replace("", pd.NA).astype("category")
+    for field in MULTI_SELECT:
+        options = df.pop(field).str.get_dummies(sep="\x1f").astype(bool)
+        # free-text answers ("Other: ...") would each become a column, so rare options are merged
+        rare = options.columns[options.sum() < min_option_count]
+        if len(rare):
+            options = options.drop(columns=rare).assign(other=options[rare].any(axis=1))
+        df = df.join(options.add_prefix(f"{field[:-1]}_"))
+    return df
+
+
+def load_simulations(path):
+    """Ground truth ("AI" or "Human") and duration of every simulation."""
+    return pd.read_csv(path, dtype={"simulation": str, "type": "category"})
+
+
+def correct_answers(df):
+    """1.0 where the answer matches the simulation type, 0.0 where it does not, NaN without an answer."""
+    return (df["label"].astype(str) == df["type"].astype(str)).where(df["label"].notna()).astype(float)
+
+
+def summarize_simulations(df, simulations):
+    """Per simulation: responses, mean scores, share of "AI" answers, accuracy and option shares."""
+    df = df.merge(simulations[["simulation", "type"]], on="simulation", how="left")
+    df["answered"] = df["label"].notna()
+    df["correct"] = correct_answers(df)
+    df["said_ai"] = (df["label"] == "AI").where(df["answered"]).astype(float)
+    options = [column for column in df.columns if column.startswith(("trait_", "reason_"))]
+    summary = df.groupby("simulation", observed=True).agg(
+        responses=("answered", "sum"),
+        confidence=("confidence", "mean"),
+        human_likeness=("human_likeness", "mean"),
+        share_ai=("said_ai", "mean"),
+        accuracy=("correct", "mean"),
+        **{option: (option, "mean") for option in options},
+    ).reset_index()
+    return simulations.merge(summary, on="simulation", how="right")
+
+
+def summarize_respondents(df, simulations):
+    """Per respondent: number of answers, accuracy and mean confidence."""
+    df = df.merge(simulations[["simulation", "type"]], on="simulation", how="left")
+    df["correct"] = correct_answers(df)
+    return df.groupby("respondent").agg(
+        answers=("label", "count"),
+        accuracy=("correct", "mean"),
+        confidence=("confidence", "mean"),
+    ).reset_index()
+
+
+def plot_confidence_duration(summary, output_file):
+    df = summary.copy()
+    # duration bins
+    df['DurationCategory'] = pd.cut(df['duration_sec'], bins=[0, 75, 120, np.inf], labels=['<1:15', '1:15–2:00', '>2:00'],
+                                    include_lowest=True)
+
+    plt.figure(figsize=(8, 5))
+    sns.boxplot(data=df, x='DurationCategory', y='confidence', hue='DurationCategory', palette='muted', legend=False)
+    sns.stripplot(data=df, x='DurationCategory', y='confidence', hue='type', dodge=True, jitter=True, alpha=0.7, marker='o', palette={'AI': 'red', 'Human': 'blue'})
+    plt.title('Reviewer Confidence vs. Simulation Duration')
+    plt.xlabel('Simulation Duration')
+    plt.ylabel('Avg. Confidence Score')
+    plt.legend(title='Simulation Type', loc='lower right')
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+
+
+def plot_accuracy(summary, output_file):
+    plt.figure(figsize=(8, 5))
+    sns.barplot(data=summary, x='simulation', y='accuracy', hue='type', palette={'AI': 'red', 'Human': 'blue'})
+    plt.title('Share of Correct Answers per Simulation')
+    plt.xlabel('Simulation')
+    plt.ylabel('Accuracy')
+    plt.ylim(0, 1)
+    plt.legend(title='Simulation Type')
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+
+
+def plot_traits(df, simulations, output_file):
+    traits = [column for column in df.columns if column.startswith("trait_")]
+    shares = (df.merge(simulations[["simulation", "type"]], on="simulation", how="left")
+              .groupby("type", observed=True)[traits].mean()
+              .rename(columns=lambda column: column[len("trait_"):])
+              .reset_index()
+              .melt(id_vars="type", var_name="trait", value_name="share"))
+    plt.figure(figsize=(8, 5))
+    sns.barplot(data=shares, x='trait', y='share', hue='type', palette={'AI': 'red', 'Human': 'blue'})
+    plt.title('Personality Traits Seen per Simulation Type')
+    plt.xlabel('Trait')
+    plt.ylabel('Share of Answers')
+    plt.legend(title='Simulation Type')
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reshape and analyze the survey export")
+    parser.add_argument("survey", nargs="?", default="thesis-evaluation-results.csv", help="Wide survey export (CSV)")
+    parser.add_argument("--simulations", default="simulations.csv", help="Type and duration of every simulation")
+    parser.add_argument("--output-dir", "-o", default="results", help="Directory for the tables and plots")
+    parser.add_argument("--long-format", choices=("csv", "parquet"), default="csv", help="File format of the long table")
+    parser.add_argument("--min-option-count", type=int, default=2,
+                        help="Multi-select options chosen less often are merged into an \"other\" column")
+    parser.add_argument("--no-plots", action="store_true", help="Only write the tables")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    df = read_survey(args.survey, args.min_option_count)
+    simulations = load_simulations(args.simulations)
+    summary = summarize_simulations(df, simulations)
+    respondents = summarize_respondents(df, simulations)
+
+    long_file = os.path.join(args.output_dir, f"survey_long.{args.long_format}")
+    if args.long_format == "parquet":
+        df.to_parquet(long_file, index=False)
+    else:
+        df.to_csv(long_file, index=False)
+    summary.to_csv(os.path.join(args.output_dir, "simulation_summary.csv"), index=False)
+    respondents.to_csv(os.path.join(args.output_dir, "respondent_summary.csv"), index=False)
+    print(f"{df['respondent'].nunique()} respondents, {df['simulation'].nunique()} simulations, "
+          f"{len(df)} rows written to {long_file}")
+    print(summary[["simulation", "type", "duration_sec", "responses", "confidence", "human_likeness", "accuracy"]]
+          .round(2).to_string(index=False))
+
+    if not args.no_plots:
+        plot_confidence_duration(summary, os.path.join(args.output_dir, "confidence_duration_boxplot.png"))
+        plot_accuracy(summary, os.path.join(args.output_dir, "accuracy_by_simulation.png"))
+        plot_traits(df, simulations, os.path.join(args.output_dir, "traits_by_type.png"))
+        print(f"Plots written to {args.output_dir}")
@@ -0,0 +1,170 @@
+import argparse
+import glob
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import yaml
+
+from score_based_check import score_commands
+from selector_based_check import selector_similarity
+from step_alignment import align, alignment_summary
+from textdistance_check import textdistance_similarities
+
+
+"""
+Scores every human playbook against every LLM playbook in one run, instead of one hard-coded pair
+per script. Each playbook is read and parsed once (with the C YAML loader when available, and
+cached on disk keyed by its modification time), and the score, selector, step alignment and
+text distance metrics of all pairs are computed in a process pool. The results are written as one row per pair to a CSV
+or, with a .parquet output path, a Parquet file.
+
+Run with:
+python evaluate_corpus.py --workers 8 --output pairwise.csv
+"""
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class InvalidPlaybook(ValueError):
+    """Raised for YAML files that are not a mapping with a list of commands."""
+
+
+class ParseCache:
+    """Parsed playbooks keyed by path, reused as long as the file's mtime and size are unchanged."""
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.entries = pickle.load(f)
+
+    def load(self, file_path):
+        """Return the text and the commands of a playbook; raises InvalidPlaybook if it is not one."""
+        stat = os.stat(file_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self.entries.get(file_path)
+        if entry is not None and entry["stamp"] == stamp:
+            self.hits += 1
+            return entry["text"], entry["commands"]
+        self.misses += 1
+        with open(file_path, "r") as f:
+            text = f.read()
+        content = yaml.load(text, Loader=Loader) or {}
+        if not isinstance(content, dict):
+            raise InvalidPlaybook(f"top level is a {type(content).__name__}, not a mapping")
+        commands = content.get("commands") or []
+        if not isinstance(commands, list):
+            raise InvalidPlaybook(f"'commands' is a {type(commands).__name__}, not a list")
+        self.entries[file_path] = {"stamp": stamp, "text": text, "commands": commands}
+        return text, commands
+
+    def save(self):
+        if self.path:
+            with open(self.path, "wb") as f:
+                pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# playbooks of the corpus in the worker processes, set once per process instead of once per pair
+_corpus = {}
+
+
+def _init_worker(corpus):
+    global _corpus
+    _corpus = corpus
+
+
+def compare_pair(pair):
+    """Metrics of the LLM playbook against the human one, which serves as the base."""
+    human, llm = _corpus[pair[0]], _corpus[pair[1]]
+    base = [c["selector"] for c in human["commands"] if "selector" in c]
+    similarity, not_in_base = selector_similarity(base, llm["commands"])
+    row = {
+        "human": pair[0],
+        "llm": pair[1],
+        "same_case": human["case"] == llm["case"],
+        "human_steps": len(human["commands"]),
+        "llm_steps": len(llm["commands"]),
+        "human_score": human["score"],
+        "llm_score": llm["score"],
+        "selector_similarity": similarity,
+        "selectors_not_in_base": len(not_in_base),
+    }
+    for name, value in alignment_summary(*align(human["commands"], llm["commands"])).items():
+        row[name if name == "alignment_similarity" else f"aligned_{name}"] = value
+    for name, value in textdistance_similarities(human["text"], llm["text"]).items():
+        row[f"text_{name}"] = value
+    return row
+
+
+def load_corpus(paths, cache):
+    """Read every playbook once and precompute its per-file score."""
+    corpus = {}
+    for path in paths:
+        text, commands = cache.load(path)
+        corpus[path] = {
+            "case": os.path.splitext(os.path.basename(path))[0],
+            "text": text,
+            "commands": commands,
+            "score": score_commands(commands),
+        }
+    return corpus
+
+
+def evaluate(human_paths, llm_paths, workers=None, cache=None):
+    """Compare every human playbook with every LLM playbook and return one row per pair."""
+    cache = cache or ParseCache()
+    corpus = load_corpus(sorted(set(human_paths) | set(llm_paths)), cache)
+    pairs = [(human, llm) for human in sorted(human_paths) for llm in sorted(llm_paths)]
+    if workers == 1:
+        _init_worker(corpus)
+        rows = [compare_pair(pair) for pair in pairs]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(corpus,)) as pool:
+            chunksize = max(1, len(pairs) // (4 * (workers or os.cpu_count() or 1)))
+            rows = list(pool.map(compare_pair, pairs, chunksize=chunksize))
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["human"] = df["human"].map(lambda path: corpus[path]["case"])
+        df["llm"] = df["llm"].map(lambda path: corpus[path]["case"])
+    return df
+
+
+def write_results(df, output):
+    if output.endswith(".parquet"):
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pairwise evaluation of human vs. LLM playbooks")
+    parser.add_argument("--human", default="../playbooks/human/cas*.yml", help="Glob of the human playbooks")
+    parser.add_argument("--llm", default="../playbooks/llm/cas*.yml", help="Glob of the LLM playbooks")
+    parser.add_argument("--workers", "-j", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--output", "-o", default="pairwise.csv", help="Result file, .csv or .parquet")
+    parser.add_argument("--parse-cache", default=".parse_cache.pickle",
+                        help="File caching the parsed playbooks between runs; empty to disable")
+    args = parser.parse_args()
+
+    cache = ParseCache(args.parse_cache or None)
+    start = time.perf_counter()
+    df = evaluate(glob.glob(args.human), glob.glob(args.llm), args.workers, cache)
+    cache.save()
+    write_results(df, args.output)
+
+    print(f"{len(df)} pairs in {time.perf_counter() - start:.2f} s "
+          f"(parse cache: {cache.hits} hits, {cache.misses} misses), written to {args.output}")
+    if not df.empty:
+        print("\nSelector similarity (%) of each LLM playbook (columns) with each human playbook (rows):")
+        print(df.pivot(index="human", columns="llm", values="selector_similarity").round(1).to_string())
+        print("\nMean metrics of same-case pairs vs. all pairs:")
+        metrics = [column for column in df.columns if column not in ("human", "llm", "same_case")]
+        print(pd.DataFrame({
+            "same case": df[df["same_case"]][metrics].mean(),
+            "all pairs": df[metrics].mean(),
+        }).round(3).to_string())
@@ -0,0 +1,228 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import yaml
+from rapidfuzz.distance import Levenshtein
+
+from evaluate_corpus import ParseCache, InvalidPlaybook
+
+
+"""
+Finds near-duplicate and collapsed playbooks in a large corpus without comparing every pair.
+Each playbook becomes a set of shingles (runs of k consecutive normalized commands), which is
+summarized by a MinHash signature. The signatures are kept in an on-disk index that is only
+updated for new or changed files. LSH banding puts playbooks with similar signatures into shared
+buckets, and only the pairs sharing a bucket are scored exactly (Jaccard similarity of the shingle
+sets and Levenshtein similarity of the command sequences).
+
+Run with:
+python near_duplicates.py "../../playbooks/llm/**/*.yml" --threshold 0.8 --output duplicates.csv
+"""
+
+# MinHash permutations are h(x) = (a * x + b) mod MERSENNE_PRIME on 32-bit shingle hashes
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_command(command):
+    """A command reduced to what makes it a different action: the command, selector and URL path."""
+    if command.get("type") == "sleep":
+        return "sleep"
+    parts = [str(command.get("type", "")), str(command.get("cmd", ""))]
+    if command.get("selector"):
+        selector = re.sub(r"\s+", " ", str(command["selector"]).strip().lower()).replace('"', "'")
+        parts.append(selector)
+    if command.get("url"):
+        url = urlparse(str(command["url"]).strip().lower())
+        parts.append(url.path.rstrip("/") + ("?" + url.query if url.query else ""))
+    return "|".join(parts)
+
+
+def command_sequence(commands):
+    return [normalize_command(command) for command in commands if isinstance(command, dict)]
+
+
+def shingles(sequence, k=3):
+    """The set of runs of k consecutive commands; shorter playbooks form a single shingle."""
+    if len(sequence) <= k:
+        return {tuple(sequence)}
+    return {tuple(sequence[i:i + k]) for i in range(len(sequence) - k + 1)}
+
+
+def hash_shingles(shingle_set):
+    """32-bit hashes of the shingles, stable across processes and runs."""
+    return np.array([
+        int.from_bytes(hashlib.blake2b("\x1f".join(shingle).encode("utf-8"), digest_size=4).digest(), "little")
+        for shingle in shingle_set
+    ], dtype=np.uint64)
+
+
+class MinHashIndex:
+    """
+    MinHash signatures of a corpus, stored as signatures.npy (one row per playbook) and index.json
+    (paths, modification times and parameters) in a directory. The signatures are loaded memory-mapped
+    and only recomputed for files that are new or have changed.
+    """
+    def __init__(self, directory, num_perm=128, shingle_size=3, seed=1):
+        self.directory = directory
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # a < 2^31, x < 2^32 and b < 2^61, so a * x + b stays below 2^64
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.paths = []
+        self.stamps = []
+        self.signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self._load()
+
+    def _load(self):
+        meta_file = os.path.join(self.directory, "index.json")
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file, "r") as f:
+            meta = json.load(f)
+        if meta["num_perm"] != self.num_perm or meta["shingle_size"] != self.shingle_size:
+            return  # built with other parameters, rebuilt on the next update
+        self.paths = meta["paths"]
+        self.stamps = [tuple(stamp) for stamp in meta["stamps"]]
+        self.signatures = np.load(os.path.join(self.directory, "signatures.npy"), mmap_mode="r")
+
+    def signature(self, hashes):
+        """Minimum of every permutation over the shingle hashes."""
+        if len(hashes) == 0:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        permuted = (np.outer(hashes, self.a) + self.b) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=0)
+
+    def update(self, paths, cache):
+        """
+        Bring the index in line with `paths`, reusing the signatures of unchanged files.
+        Returns the number of new signatures and the paths skipped because they do not parse.
+        """
+        known = {path: row for row, path in enumerate(self.paths)}
+        indexed, signatures, stamps, skipped = [], [], [], []
+        computed = 0
+        for path in paths:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if path in known and self.stamps[known[path]] == stamp:
+                signatures.append(self.signatures[known[path]])
+            else:
+                try:
+                    _, commands = cache.load(path)
+                except (yaml.YAMLError, InvalidPlaybook) as e:
+                    print(f"Skipping {path}: not a valid playbook ({str(e).splitlines()[0]})")
+                    skipped.append(path)
+                    continue
+                signatures.append(self.signature(hash_shingles(shingles(command_sequence(commands), self.shingle_size))))
+                computed += 1
+            indexed.append(path)
+            stamps.append(stamp)
+        self.paths, self.stamps = indexed, stamps
+        self.signatures = np.array(signatures, dtype=np.uint64).reshape(len(indexed), self.num_perm)
+        self.save()
+        return computed, skipped
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(os.path.join(self.directory, "signatures.npy"), self.signatures)
+        with open(os.path.join(self.directory, "index.json"), "w") as f:
+            json.dump({"num_perm": self.num_perm, "shingle_size": self.shingle_size,
+                       "paths": self.paths, "stamps": self.stamps}, f)
+
+    def candidates(self, bands):
+        """Pairs of rows whose signatures agree on all rows of at least one band."""
+        rows_per_band = self.num_perm // bands
+        pairs = set()
+        for band in range(bands):
+            buckets = defaultdict(list)
+            chunk = np.ascontiguousarray(self.signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+            for row, key in enumerate(chunk):
+                buckets[key.tobytes()].append(row)
+            for members in buckets.values():
+                for i in range(len(members)):
+                    for j in range(i + 1, len(members)):
+                        pairs.add((members[i], members[j]))
+        return pairs
+
+    def estimated_similarity(self, i, j):
+        return float(np.mean(self.signatures[i] == self.signatures[j]))
+
+
+def score_candidates(index, pairs, cache, threshold):
+    """Exact similarities of the candidate pairs; pairs below `threshold` Jaccard similarity are dropped."""
+    sequences = {}
+
+    def sequence(row):
+        if row not in sequences:
+            try:
+                _, commands = cache.load(index.paths[row])
+                sequences[row] = command_sequence(commands)
+            except (yaml.YAMLError, InvalidPlaybook) as e:
+                # changed since it was indexed
+                print(f"Skipping {index.paths[row]}: not a valid playbook ({str(e).splitlines()[0]})")
+                sequences[row] = None
+        return sequences[row]
+
+    rows = []
+    for i, j in sorted(pairs):
+        a, b = sequence(i), sequence(j)
+        if a is None or b is None:
+            continue
+        shingles_a, shingles_b = shingles(a, index.shingle_size), shingles(b, index.shingle_size)
+        jaccard = len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+        if jaccard < threshold:
+            continue
+        rows.append({
+            "playbook_a": index.paths[i],
+            "playbook_b": index.paths[j],
+            "estimated_jaccard": index.estimated_similarity(i, j),
+            "jaccard": jaccard,
+            "levenshtein": Levenshtein.normalized_similarity(a, b),
+            "steps_a": len(a),
+            "steps_b": len(b),
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near-duplicate detection for playbooks with MinHash and LSH")
+    parser.add_argument("playbooks", nargs="+", help="Glob patterns of the playbooks (** is recursive)")
+    parser.add_argument("--index", default=".minhash_index", help="Directory of the on-disk signature index")
+    parser.add_argument("--shingle-size", type=int, default=3, help="Consecutive commands per shingle")
+    parser.add_argument("--num-perm", type=int, default=128, help="MinHash permutations per signature")
+    parser.add_argument("--bands", type=int, default=32,
+                        help="LSH bands; more bands find pairs with lower similarity, at more candidates")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Minimum exact Jaccard similarity of reported pairs")
+    parser.add_argument("--output", "-o", default="duplicates.csv", help="Result file, .csv or .parquet")
+    args = parser.parse_args()
+    if args.num_perm % args.bands:
+        parser.error("--num-perm must be a multiple of --bands")
+
+    paths = sorted({os.path.abspath(path) for pattern in args.playbooks for path in glob.glob(pattern, recursive=True)})
+    cache = ParseCache()
+    start = time.perf_counter()
+    index = MinHashIndex(args.index, args.num_perm, args.shingle_size)
+    computed, skipped = index.update(paths, cache)
+    pairs = index.candidates(args.bands)
+    df = score_candidates(index, pairs, cache, args.threshold)
+    if args.output.endswith(".parquet"):
+        df.to_parquet(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
+
+    total = len(index.paths) * (len(index.paths) - 1) // 2
+    print(f"{len(index.paths)} playbooks indexed ({computed} new signatures), {len(skipped)} skipped, "
+          f"{len(pairs)} candidate pairs of {total}, "
+          f"{len(df)} near-duplicates in {time.perf_counter() - start:.2f} s, written to {args.output}")
+    if not df.empty:
+        print(df.sort_values("jaccard", ascending=False).head(20).to_string(index=False))
@@ -16,36 +16,40 @@ high_prio_selectors = ["input[name='username']", "input[name='password']"] # 4pt
 mid_prio_selectors = ["button[type='submit'][value='Apply']","a[href='?view=watch&mid=1']"] # 2pts
 low_prio_selectors = ["button[name='action'][value='logout']"] # 1pts
 
-def read_and_loop_yaml(file_path):
+def score_commands(commands):
+    """Score of a list of playbook commands, using the priorities above."""
     overall_score = 0
+    for v in commands:
+        for k,c in v.items():
+            if k == "cmd":
+                overall_score += 10 if c in high_prio_cmds else 0
+                overall_score += 5 if c in mid_prio_cmds else 0
+                overall_score += 2 if c in low_prio_cmds else 0
+            elif k == "selector":
+                overall_score += 4 if c in high_prio_selectors else 0
+                overall_score += 2 if c in mid_prio_selectors else 0
+                overall_score += 1 if c in low_prio_selectors else 0
+    return overall_score
+
+def read_and_loop_yaml(file_path):
     # Open and read the YAML file
     with open(file_path, 'r') as file:
         content = yaml.safe_load(file)
     
     # Loop through the YAML content
     print(f"File: {file_path}")
-    for key, value in content.items():
-        if key == "commands":
-            for v in value:
-                for k,c in v.items():
-                    if k == "cmd":
-                        overall_score += 10 if c in high_prio_cmds else 0
-                        overall_score += 5 if c in mid_prio_cmds else 0
-                        overall_score += 2 if c in low_prio_cmds else 0
-                    elif k == "selector":
-                        overall_score += 4 if c in high_prio_selectors else 0
-                        overall_score += 2 if c in mid_prio_selectors else 0
-                        overall_score += 1 if c in low_prio_selectors else 0
+    overall_score = score_commands(content.get("commands") or [])
 
     print(f"The overall score: {overall_score}")
     print("-"*50)
 
 
-print("\nRegarding the overall score, the higher the better.")
-print("-"*50)
+if __name__ == "__main__":
+    print("\nRegarding the overall score, the higher the better.")
+    print("-"*50)
 
-file_path = "../playbooks/manual/admin1.yml"
-read_and_loop_yaml(file_path)
+    file_path = "../playbooks/manual/admin1.yml"
+    read_and_loop_yaml(file_path)
 
-file_path = "../playbooks/llm/admin1_a.yml"
-read_and_loop_yaml(file_path)
+    file_path = "../playbooks/llm/admin1_a.yml"
+    read_and_loop_yaml(file_path)
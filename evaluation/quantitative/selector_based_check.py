@@ -19,42 +19,48 @@ def get_base_selectors(file_path):
                     if k == "selector":
                         base_selectors.append(c)
                     
-def read_and_loop_yaml(file_path):
-    tmp_base_selector = base_selectors.copy()
+def selector_similarity(base, commands):
+    """
+    Share (in %) of the `base` selectors that are used in `commands`, each use matching one base
+    selector, and the selectors used in `commands` that are not in the base.
+    """
+    tmp_base_selector = list(base)
     tmp_not_in_base_selector = []
-    len_base_selectors = len(base_selectors)
+    for v in commands:
+        c = v.get("selector")
+        if c is None:
+            continue
+        if c in tmp_base_selector:
+            tmp_base_selector.remove(c)
+        else:
+            tmp_not_in_base_selector.append(c)
+    if not base:
+        return 0.0, tmp_not_in_base_selector
+    similarity_in_selectors = ((len(base) - len(tmp_base_selector)) / len(base)) * 100
+    return similarity_in_selectors, tmp_not_in_base_selector
+
+def read_and_loop_yaml(file_path):
     # Open and read the YAML file
     with open(file_path, 'r') as file:
         content = yaml.safe_load(file)
     
     # Loop through the YAML content
     print(f"File: {file_path}")
-    for key, value in content.items():
-        if key == "commands":
-            for v in value:
-                for k,c in v.items():
-                    if k == "cmd":
-                        None
-                    elif k == "selector":
-                        if c in tmp_base_selector:
-                            tmp_base_selector.remove(c)
-                        else:
-                            tmp_not_in_base_selector.append(c)
-    print(f"Base selector list length: {len_base_selectors}")
-    print(f"Tmp selector list length: {len(tmp_base_selector)}")
-    similarity_in_selectors = ((len_base_selectors - len(tmp_base_selector)) / len_base_selectors) * 100
+    similarity_in_selectors, tmp_not_in_base_selector = selector_similarity(base_selectors, content.get("commands") or [])
+    print(f"Base selector list length: {len(base_selectors)}")
     print(f"The similarity in used selectors: {similarity_in_selectors:.2f}%")
     print(f"Used selectors, that are not in the base: {tmp_not_in_base_selector}")
     print("-"*50)
 
 
-print("\nGives a harsh similarity check for the used selectors")
-print("-"*50)
+if __name__ == "__main__":
+    print("\nGives a harsh similarity check for the used selectors")
+    print("-"*50)
 
-# It uses the manual playbook as the base
-file_path = "../playbooks/manual/admin1.yml"
-get_base_selectors(file_path)
-read_and_loop_yaml(file_path)
+    # It uses the manual playbook as the base
+    file_path = "../playbooks/manual/admin1.yml"
+    get_base_selectors(file_path)
+    read_and_loop_yaml(file_path)
 
-file_path = "../playbooks/llm/admin1_a.yml"
-read_and_loop_yaml(file_path)
+    file_path = "../playbooks/llm/admin1_a.yml"
+    read_and_loop_yaml(file_path)
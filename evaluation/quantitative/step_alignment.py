@@ -0,0 +1,169 @@
+import argparse
+import re
+from urllib.parse import urlparse
+
+import numpy as np
+import yaml
+
+
+"""
+Aligns the commands of a generated playbook with those of a reference playbook step by step
+(Needleman-Wunsch), instead of only checking which selectors occur somewhere in both files.
+Aligning two steps costs more the more they differ in command, selector and URL; skipping a step
+costs GAP_COST. The alignment labels every step as a match, a near match (selectors or URLs with the
+same tokens but a different string, e.g. other quoting), a substitution (aligned but different),
+an insert (only in the generated playbook) or a delete (only in the reference).
+
+The substitution costs of all step pairs are computed at once from token incidence matrices, and
+the DP runs one row at a time with NumPy, so playbooks with hundreds of steps align in milliseconds.
+
+Run with:
+python step_alignment.py ../playbooks/human/cas01.yml ../playbooks/llm/cas01.yml
+"""
+
+GAP_COST = 1.0
+# weights of the differences between two aligned steps; steps of a different type are never aligned
+CMD_WEIGHT = 1.0
+SELECTOR_WEIGHT = 1.0
+URL_WEIGHT = 0.5
+TYPE_MISMATCH_COST = 2 * GAP_COST + 1
+# least cost of a selector or URL that differs as a string but not in its tokens, so it is no match
+NEAR_MATCH_COST = 0.01
+
+
+def step_tokens(value, url=False):
+    """Tokens of a selector or URL, e.g. "input[name='username']" -> {"input", "name", "username"}."""
+    if not value:
+        return set()
+    value = str(value).lower()
+    if url:
+        parsed = urlparse(value)
+        value = f"{parsed.path} {parsed.query}"
+    return set(re.findall(r"[a-z0-9_-]+", value))
+
+
+def token_similarity(tokens_a, tokens_b):
+    """Jaccard similarity of every token set in `tokens_a` with every one in `tokens_b` (1 if both are empty)."""
+    vocabulary = {token: i for i, token in enumerate(sorted(set().union(*tokens_a, *tokens_b)))}
+    a = np.zeros((len(tokens_a), len(vocabulary)), dtype=np.float32)
+    b = np.zeros((len(tokens_b), len(vocabulary)), dtype=np.float32)
+    for matrix, token_sets in ((a, tokens_a), (b, tokens_b)):
+        for row, tokens in enumerate(token_sets):
+            matrix[row, [vocabulary[token] for token in tokens]] = 1
+    intersection = a @ b.T
+    union = a.sum(axis=1)[:, None] + b.sum(axis=1)[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1), 1.0)
+
+
+def substitution_costs(reference, generated):
+    """Cost of aligning every reference step with every generated step, as an n x m matrix."""
+    def column(steps, key):
+        return np.array([str(step.get(key, "")) for step in steps], dtype=object)
+
+    types_differ = column(reference, "type")[:, None] != column(generated, "type")[None, :]
+    cmds_differ = column(reference, "cmd")[:, None] != column(generated, "cmd")[None, :]
+    selectors_equal = column(reference, "selector")[:, None] == column(generated, "selector")[None, :]
+    urls_equal = column(reference, "url")[:, None] == column(generated, "url")[None, :]
+    selector_similarity = token_similarity(
+        [step_tokens(step.get("selector")) for step in reference],
+        [step_tokens(step.get("selector")) for step in generated],
+    )
+    url_similarity = token_similarity(
+        [step_tokens(step.get("url"), url=True) for step in reference],
+        [step_tokens(step.get("url"), url=True) for step in generated],
+    )
+    costs = (CMD_WEIGHT * cmds_differ
+             + SELECTOR_WEIGHT * np.where(selectors_equal, 0.0, np.maximum(1 - selector_similarity, NEAR_MATCH_COST))
+             + URL_WEIGHT * np.where(urls_equal, 0.0, np.maximum(1 - url_similarity, NEAR_MATCH_COST)))
+    return np.where(types_differ, TYPE_MISMATCH_COST, costs)
+
+
+def align(reference, generated, include_sleeps=False):
+    """
+    Align two lists of playbook commands. Returns (cost, steps), where every step is a tuple
+    (label, reference index, generated index, cost) with None for the index of the missing side.
+    Sleep steps are left out unless `include_sleeps` is set; indices refer to the given lists.
+    """
+    ref_index = [i for i, step in enumerate(reference) if include_sleeps or step.get("type") != "sleep"]
+    gen_index = [j for j, step in enumerate(generated) if include_sleeps or step.get("type") != "sleep"]
+    n, m = len(ref_index), len(gen_index)
+    costs = substitution_costs([reference[i] for i in ref_index], [generated[j] for j in gen_index])
+
+    # D[i, j]: cost of aligning the first i reference steps with the first j generated steps.
+    # Within a row, D[i, j] = min over l <= j of T[l] + GAP_COST * (j - l), where T is the best of the
+    # diagonal and vertical moves, which is a running minimum of T[l] - GAP_COST * l.
+    gaps = GAP_COST * np.arange(m + 1)
+    dp = np.empty((n + 1, m + 1))
+    dp[0] = gaps
+    for i in range(1, n + 1):
+        best = np.empty(m + 1)
+        best[0] = dp[i - 1, 0] + GAP_COST
+        best[1:] = np.minimum(dp[i - 1, :-1] + costs[i - 1], dp[i - 1, 1:] + GAP_COST)
+        dp[i] = np.minimum.accumulate(best - gaps) + gaps
+
+    steps = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and np.isclose(dp[i, j], dp[i - 1, j - 1] + costs[i - 1, j - 1]):
+            cost = float(costs[i - 1, j - 1])
+            steps.append((step_label(cost), ref_index[i - 1], gen_index[j - 1], cost))
+            i, j = i - 1, j - 1
+        elif i > 0 and np.isclose(dp[i, j], dp[i - 1, j] + GAP_COST):
+            steps.append(("delete", ref_index[i - 1], None, GAP_COST))
+            i -= 1
+        else:
+            steps.append(("insert", None, gen_index[j - 1], GAP_COST))
+            j -= 1
+    steps.reverse()
+    return float(dp[n, m]), steps
+
+
+def step_label(cost):
+    """Label of two aligned steps with the given substitution cost."""
+    if cost == 0:
+        return "match"
+    if cost <= NEAR_MATCH_COST * (SELECTOR_WEIGHT + URL_WEIGHT):
+        return "near_match"
+    return "substitute"
+
+
+def alignment_summary(cost, steps):
+    """Counts of the labels and a similarity in [0, 1], where 1 means every step matched."""
+    summary = {label: 0 for label in ("match", "near_match", "substitute", "insert", "delete")}
+    for label, *_ in steps:
+        summary[label] += 1
+    worst = GAP_COST * (summary["match"] + (summary["near_match"] + summary["substitute"]) * 2
+                        + summary["insert"] + summary["delete"])
+    summary["alignment_similarity"] = 1 - cost / worst if worst else 1.0
+    return summary
+
+
+def describe(step):
+    if step is None:
+        return ""
+    return " ".join(str(step[key]) for key in ("cmd", "selector", "url", "seconds") if key in step) or step.get("type", "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Step-by-step alignment of a generated playbook with a reference")
+    parser.add_argument("reference", help="Reference (e.g. human) playbook")
+    parser.add_argument("generated", nargs="+", help="Generated playbooks to align with the reference")
+    parser.add_argument("--include-sleeps", action="store_true", help="Also align sleep steps")
+    args = parser.parse_args()
+
+    Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(args.reference, "r") as file:
+        reference = yaml.load(file, Loader=Loader)["commands"]
+    for path in args.generated:
+        with open(path, "r") as file:
+            generated = yaml.load(file, Loader=Loader)["commands"]
+        cost, steps = align(reference, generated, args.include_sleeps)
+        print(f"File: {path}")
+        for label, i, j, step_cost in steps:
+            ref = describe(reference[i] if i is not None else None)
+            gen = describe(generated[j] if j is not None else None)
+            print(f"{label:<10} {step_cost:4.2f}  {ref[:55]:<55}  {gen[:55]}")
+        summary = alignment_summary(cost, steps)
+        print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+                        for key, value in summary.items()))
+        print("-"*50)
@@ -1,4 +1,5 @@
 import textdistance
+from rapidfuzz.distance import Levenshtein
 
 
 """
@@ -29,8 +30,8 @@ def textdistance_similarity_levenshtein(file1, file2):
         content1 = f1.read()
         content2 = f2.read()
     
-    # Return the normalized levenshtein distance
-    similarity = 1 - textdistance.levenshtein.normalized_distance(content1, content2)
+    # Return the normalized levenshtein similarity (rapidfuzz, as textdistance's pure-Python one takes seconds per file)
+    similarity = Levenshtein.normalized_similarity(content1, content2)
     return similarity
 
 def textdistance_similarity_sorensen(file1, file2):
@@ -42,13 +43,24 @@ def textdistance_similarity_sorensen(file1, file2):
     return similarity
 
 
-file1 = "../playbooks/llm/admin1_a.yml"
-file2 = "../playbooks/manual/admin1.yml"
-similarity_cosine = textdistance_similarity_cosine(file1, file2)
-similarity_jaccard = textdistance_similarity_jaccard(file1, file2)
-similarity_levenshtein = textdistance_similarity_levenshtein(file1, file2)
-similarity_sorensen = textdistance_similarity_sorensen(file1, file2)
-print(f"Similarity cosine: {similarity_cosine * 100:.2f}%")
-print(f"Similarity jaccard: {similarity_jaccard * 100:.2f}%")
-print(f"Similarity levenshtein: {similarity_levenshtein * 100:.2f}%")
-print(f"Similarity sorensen: {similarity_sorensen * 100:.2f}%")
+def textdistance_similarities(content1, content2):
+    """All of the above similarities of two file contents, by name."""
+    return {
+        "cosine": textdistance.cosine(content1, content2),
+        "jaccard": textdistance.jaccard(content1, content2),
+        "levenshtein": Levenshtein.normalized_similarity(content1, content2),
+        "sorensen": textdistance.sorensen(content1, content2),
+    }
+
+
+if __name__ == "__main__":
+    file1 = "../playbooks/llm/admin1_a.yml"
+    file2 = "../playbooks/manual/admin1.yml"
+    similarity_cosine = textdistance_similarity_cosine(file1, file2)
+    similarity_jaccard = textdistance_similarity_jaccard(file1, file2)
+    similarity_levenshtein = textdistance_similarity_levenshtein(file1, file2)
+    similarity_sorensen = textdistance_similarity_sorensen(file1, file2)
+    print(f"Similarity cosine: {similarity_cosine * 100:.2f}%")
+    print(f"Similarity jaccard: {similarity_jaccard * 100:.2f}%")
+    print(f"Similarity levenshtein: {similarity_levenshtein * 100:.2f}%")
+    print(f"Similarity sorensen: {similarity_sorensen * 100:.2f}%")
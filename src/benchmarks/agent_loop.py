@@ -0,0 +1,247 @@
+"""
+Offline end-to-end benchmark of the agent loop.
+
+Serves the local ZoneMinder stand-in (zm_app.py) and drives `run_full_turn` with a scripted
+fake model that logs in, opens the options and the log page and takes element snapshots along
+the way, like a real generation would. No network access or API key is needed.
+
+Records per completion: wall time, Playwright round-trips, prompt tokens and the bytes and
+tokens of the element snapshots that were returned since the previous completion. Results are
+saved as JSON, so runs can be compared across commits with --compare.
+
+Run with:
+python agent_loop.py [--monitors 200] [--latency 0] [--output results.json]
+python agent_loop.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from openai.types.chat import ChatCompletion
+import playbookgen.main as agent
+from playbookgen.main import Generation, run_full_turn
+from playbookgen.system_message import SYSTEM_MESSAGE
+from playbookgen.utils.browser_pool import BrowserPool
+from playbookgen.utils.context_compaction import ContextCompactor
+from playbookgen.utils.snapshot_format import SnapshotFormatter, count_tokens
+from zm_app import ZoneMinderApp
+
+
+SESSION = "zm_session"
+
+
+def build_script(base_url: str) -> list:
+    """Completions of the fake model: each is a list of (tool, arguments) calls, or the final text."""
+    def browser(cmd, **step):
+        return ("add_playbook_step", {"step_type": "browser", "cmd": cmd, **step})
+
+    def sleep(seconds):
+        return ("add_playbook_step", {"step_type": "sleep", "seconds": seconds})
+
+    snapshot = ("get_interactive_elements", {"session_id": SESSION})
+    return [
+        [browser("visit", url=base_url, creates_session=SESSION), sleep(3)],
+        [snapshot],
+        [browser("type", selector="input[name='username']", text="admin", session=SESSION), sleep(2)],
+        [snapshot],
+        [browser("type", selector="input[name='password']", text="secret", session=SESSION), sleep(2)],
+        [snapshot],
+        [browser("click", selector="button[type='submit']", session=SESSION), sleep(4)],
+        [snapshot],
+        [browser("click", selector="a.nav-link[href='?view=options']", session=SESSION), sleep(5)],
+        [snapshot],
+        [browser("click", selector="a[href='?view=options&tab=network']", session=SESSION), sleep(3)],
+        [snapshot],
+        [browser("click", selector="a.nav-link[href='?view=log']", session=SESSION), sleep(6)],
+        [snapshot],
+        "Done.",
+    ]
+
+
+class PlaywrightCallCounter:
+    """Counts the messages sent to the Playwright driver, i.e. the IPC round-trips."""
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self):
+        from playwright._impl._connection import Channel
+        self._original = Channel._inner_send
+        counter = self
+
+        async def counting_send(channel, *args, **kwargs):
+            counter.count += 1
+            return await counter._original(channel, *args, **kwargs)
+
+        Channel._inner_send = counting_send
+        return self
+
+    def __exit__(self, *exc):
+        from playwright._impl._connection import Channel
+        Channel._inner_send = self._original
+
+
+class ScriptedCompletions:
+    """Stands in for `client.chat.completions`, answering with the scripted tool calls."""
+    def __init__(self, script: list, latency: float, counter: PlaywrightCallCounter):
+        self.script = script
+        self.latency = latency
+        self.counter = counter
+        self.position = 0
+        self.records = []
+        self._last = None
+
+    def _record(self, messages: list) -> None:
+        now = time.perf_counter()
+        snapshot_calls = set()
+        for message in messages:
+            calls = message.get("tool_calls") if isinstance(message, dict) else getattr(message, "tool_calls", None)
+            for call in calls or []:
+                call_id = call["id"] if isinstance(call, dict) else call.id
+                name = call["function"]["name"] if isinstance(call, dict) else call.function.name
+                if name == "get_interactive_elements":
+                    snapshot_calls.add(call_id)
+
+        # the tool results since the previous completion are at the end of the messages
+        new_snapshots = []
+        for message in reversed(messages):
+            if not isinstance(message, dict) or message.get("role") != "tool":
+                break
+            if message["tool_call_id"] in snapshot_calls:
+                new_snapshots.append(message["content"])
+
+        prompt = "".join(
+            (message.get("content") if isinstance(message, dict) else message.content) or ""
+            for message in messages
+        )
+        if self._last is not None:
+            self.records[-1]["wall_ms"] = round((now - self._last[0]) * 1000, 1)
+            self.records[-1]["playwright_calls"] = self.counter.count - self._last[1]
+            self.records[-1]["snapshot_bytes"] = sum(len(text.encode("utf-8")) for text in new_snapshots)
+            self.records[-1]["snapshot_tokens"] = sum(count_tokens(text) for text in new_snapshots)
+        self.records.append({"completion": len(self.records) + 1, "prompt_tokens": count_tokens(prompt)})
+        self._last = (now, self.counter.count)
+
+    async def create(self, model, messages, tools=None, **kwargs):
+        self._record(messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        step = self.script[self.position]
+        self.position += 1
+        if isinstance(step, str):
+            message = {"role": "assistant", "content": step}
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{self.position}_{i}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(arguments)}}
+                for i, (name, arguments) in enumerate(step)
+            ]}
+        return ChatCompletion.model_validate({
+            "id": f"scripted-{self.position}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop" if isinstance(step, str) else "tool_calls",
+                         "message": message}],
+        })
+
+    def finish(self) -> None:
+        """Close the record of the last completion, which has no following request."""
+        if self._last is not None:
+            self.records[-1]["wall_ms"] = round((time.perf_counter() - self._last[0]) * 1000, 1)
+            self.records[-1]["playwright_calls"] = self.counter.count - self._last[1]
+            self.records[-1]["snapshot_bytes"] = 0
+            self.records[-1]["snapshot_tokens"] = 0
+
+
+class ScriptedClient:
+    def __init__(self, completions: ScriptedCompletions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+async def run_benchmark(monitors: int, log_rows: int, latency: float, snapshot_format: str) -> dict:
+    with ZoneMinderApp(monitors=monitors, log_rows=log_rows) as app, PlaywrightCallCounter() as counter:
+        completions = ScriptedCompletions(build_script(app.base_url), latency, counter)
+        agent.client = ScriptedClient(completions)
+        browser_pool = BrowserPool()
+        generation = Generation(browser_pool, snapshot_formatter=SnapshotFormatter(snapshot_format), elements_file=None)
+        start = time.perf_counter()
+        try:
+            messages = [{"role": "user", "content": "Log in to ZoneMinder and review the options and logs."}]
+            await run_full_turn(SYSTEM_MESSAGE, generation.tools, messages, compactor=ContextCompactor())
+            completions.finish()
+        finally:
+            await generation.close()
+            await browser_pool.close()
+        total_s = time.perf_counter() - start
+
+    records = completions.records
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"monitors": monitors, "log_rows": log_rows, "latency_s": latency, "snapshot_format": snapshot_format},
+        "totals": {
+            "wall_s": round(total_s, 3),
+            "completions": len(records),
+            "playwright_calls": sum(record["playwright_calls"] for record in records),
+            "snapshot_bytes": sum(record["snapshot_bytes"] for record in records),
+            "snapshot_tokens": sum(record["snapshot_tokens"] for record in records),
+            "prompt_tokens": sum(record["prompt_tokens"] for record in records),
+        },
+        "completions": records,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict) -> None:
+    print(f"{'#':>3} {'wall (ms)':>10} {'pw calls':>9} {'snap bytes':>11} {'snap tok':>9} {'prompt tok':>11}")
+    for record in results["completions"]:
+        print(f"{record['completion']:>3} {record['wall_ms']:>10.1f} {record['playwright_calls']:>9} "
+              f"{record['snapshot_bytes']:>11} {record['snapshot_tokens']:>9} {record['prompt_tokens']:>11}")
+    totals = results["totals"]
+    print(f"total {totals['wall_s']:.2f} s, {totals['playwright_calls']} Playwright calls, "
+          f"{totals['snapshot_bytes']} snapshot bytes / {totals['snapshot_tokens']} tokens, "
+          f"{totals['prompt_tokens']} prompt tokens (commit {results['commit']})")
+
+
+def compare(before_file: str, after_file: str) -> None:
+    with open(before_file) as f:
+        before = json.load(f)
+    with open(after_file) as f:
+        after = json.load(f)
+    print(f"{'metric':<18} {before['commit']:>12} {after['commit']:>12} {'change':>9}")
+    for key, old in before["totals"].items():
+        new = after["totals"].get(key, 0)
+        change = f"{(new - old) / old:+.0%}" if old else "-"
+        print(f"{key:<18} {old:>12} {new:>12} {change:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the agent loop")
+    parser.add_argument("--monitors", type=int, default=200, help="Monitors on the console page (DOM size)")
+    parser.add_argument("--log-rows", type=int, default=500, help="Rows on the log page")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency per completion in seconds")
+    parser.add_argument("--snapshot-format", choices=("compact", "table", "json"), default="compact")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Optional path to write JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved results")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        results = asyncio.run(run_benchmark(args.monitors, args.log_rows, args.latency, args.snapshot_format))
+        print_results(results)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
@@ -0,0 +1,116 @@
+"""
+Benchmark for interactive element extraction on synthetic DOMs.
+
+Compares the per-element approach (one Playwright round-trip per field and element) with the
+batched single-evaluation extraction used by `get_interactive_elements`.
+
+Run with:
+python dom_extraction.py [--sizes 100 1000 10000] [--naive-max 2000] [--output results.json]
+"""
+import argparse
+import json
+import random
+import time
+from playwright.sync_api import sync_playwright, Page
+from playbookgen.utils.browser_helpers import (
+    INTERACTIVE_SELECTOR,
+    build_naive_css_selector,
+    extract_interactive_elements,
+)
+
+
+DEFAULT_SIZES = [100, 500, 1000, 5000, 10000]
+
+
+def build_synthetic_page(num_elements: int, seed: int = 0) -> str:
+    """
+    Build an HTML document with `num_elements` interactive elements spread over nested
+    containers, roughly resembling an admin page full of nav links, tables and forms.
+    """
+    rng = random.Random(seed)
+    parts = ["<html><body><nav class='navbar'><ul>"]
+    for i in range(num_elements):
+        if i and i % 50 == 0:
+            parts.append(f"</ul></nav><div class='section section-{i // 50}'><ul>")
+        kind = rng.choice(["a", "a", "a", "button", "input", "select", "textarea"])
+        if kind == "a":
+            parts.append(f"<li><a class='nav-link' href='?view=item&id={i}'>Item {i}</a></li>")
+        elif kind == "button":
+            parts.append(f"<li><button type='submit' name='action' value='b{i}'>Button {i}</button></li>")
+        elif kind == "input":
+            parts.append(f"<li><input type='text' name='field{i}' placeholder='Field {i}'></li>")
+        elif kind == "select":
+            parts.append(f"<li><select name='select{i}'><option>A</option><option>B</option></select></li>")
+        else:
+            parts.append(f"<li><textarea id='area{i}'></textarea></li>")
+    parts.append("</ul></div></body></html>")
+    return "".join(parts)
+
+
+def extract_per_element(page: Page) -> list:
+    """
+    The previous extraction strategy: query the handles, then fetch every field separately.
+    """
+    elements = page.query_selector_all(INTERACTIVE_SELECTOR)
+    interactive_elements = []
+    for idx, elem in enumerate(elements, start=1):
+        interactive_elements.append({
+            "index": idx,
+            "selector": f"css={build_naive_css_selector(elem)}",
+            "tag": elem.evaluate("el => el.tagName"),
+            "text": elem.inner_text().strip(),
+            "type": elem.get_attribute("type"),
+            "id": elem.get_attribute("id"),
+            "class": elem.get_attribute("class"),
+        })
+    return interactive_elements
+
+
+def time_call(func, page: Page, repeat: int) -> float:
+    """Return the best wall time of `repeat` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(page)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_benchmark(sizes, naive_max: int, repeat: int) -> list:
+    results = []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        page = browser.new_page()
+        for size in sizes:
+            page.set_content(build_synthetic_page(size))
+            batched_ms = time_call(extract_interactive_elements, page, repeat)
+            naive_ms = time_call(extract_per_element, page, 1) if size <= naive_max else None
+            results.append({"elements": size, "batched_ms": batched_ms, "per_element_ms": naive_ms})
+        browser.close()
+    return results
+
+
+def print_results(results: list) -> None:
+    print(f"{'elements':>10} {'batched (ms)':>14} {'per-element (ms)':>18} {'speedup':>9}")
+    for row in results:
+        naive = row["per_element_ms"]
+        naive_col = f"{naive:18.1f}" if naive is not None else f"{'skipped':>18}"
+        speedup = f"{naive / row['batched_ms']:8.1f}x" if naive is not None else f"{'-':>9}"
+        print(f"{row['elements']:>10} {row['batched_ms']:14.1f} {naive_col} {speedup}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark interactive element extraction")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Number of interactive elements in each synthetic page")
+    parser.add_argument("--naive-max", type=int, default=2000,
+                        help="Skip the per-element strategy for pages larger than this")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size for the batched strategy")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.naive_max, args.repeat)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,371 @@
+"""
+A local OpenAI-compatible server that records real sessions and replays them, for load tests.
+
+In record mode every request is forwarded to the real API and the exchange is saved to the
+recordings directory. In replay mode the recorded responses are served without network access,
+with a configurable latency and token rate. Both the chat completions API (main.py, batch.py,
+streaming or not) and the Responses API (experiments/cua.py) are supported.
+
+A session is identified by the model and its first user input, and each request is answered with
+the response recorded at the same position of the session: the number of assistant messages in a
+chat request, or the position after `previous_response_id` for the Responses API. Unknown sessions
+are mapped onto one of the recorded ones, and requests beyond the end of a recording get its last
+response, so any number of concurrent generations can be replayed from a few recordings.
+
+Point the clients at the server through their base URL:
+python mock_openai.py record --recordings recordings
+python mock_openai.py replay --recordings recordings --latency 0.5 --token-rate 80
+OPENAI_BASE_URL=http://127.0.0.1:8000/v1 python ../playbookgen/batch.py ../../prompts -j 16
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+UPSTREAM_URL = "https://api.openai.com/v1"
+ENDPOINTS = {"/v1/chat/completions": "chat", "/v1/responses": "responses"}
+# headers passed on to the real API when recording
+FORWARDED_HEADERS = ("Authorization", "Content-Type", "OpenAI-Organization", "OpenAI-Project", "OpenAI-Beta")
+
+
+def _first_user_input(request: dict, api: str) -> str:
+    items = request.get("messages", []) if api == "chat" else request.get("input", [])
+    if isinstance(items, str):
+        return items
+    for item in items:
+        if isinstance(item, dict) and item.get("role") == "user":
+            return json.dumps(item.get("content"), sort_keys=True)
+    return ""
+
+
+def session_key(request: dict, api: str) -> str:
+    """Identify a session by its API, model and first user input."""
+    data = json.dumps([api, request.get("model"), _first_user_input(request, api)])
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def chat_position(request: dict) -> int:
+    """Position of a chat request in its session: the number of assistant messages so far."""
+    return sum(1 for message in request.get("messages", []) if message.get("role") == "assistant")
+
+
+def assemble_chunks(chunks: list) -> dict:
+    """Assemble streamed chat completion chunks into the equivalent non-streamed response."""
+    content = []
+    calls = []
+    completion = {"id": "", "created": 0, "model": "", "finish_reason": "stop", "usage": None}
+    for chunk in chunks:
+        completion.update(id=chunk.get("id", ""), created=chunk.get("created", 0), model=chunk.get("model", ""))
+        if chunk.get("usage"):
+            completion["usage"] = chunk["usage"]
+        for choice in chunk.get("choices", [])[:1]:
+            if choice.get("finish_reason"):
+                completion["finish_reason"] = choice["finish_reason"]
+            delta = choice.get("delta", {})
+            if delta.get("content"):
+                content.append(delta["content"])
+            for part in delta.get("tool_calls") or []:
+                while len(calls) <= part["index"]:
+                    calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+                call = calls[part["index"]]
+                call["id"] = part.get("id") or call["id"]
+                function = part.get("function") or {}
+                call["function"]["name"] += function.get("name") or ""
+                call["function"]["arguments"] += function.get("arguments") or ""
+    message = {"role": "assistant", "content": "".join(content) or None}
+    if calls:
+        message["tool_calls"] = calls
+    return {
+        "id": completion["id"],
+        "object": "chat.completion",
+        "created": completion["created"],
+        "model": completion["model"],
+        "choices": [{"index": 0, "finish_reason": completion["finish_reason"], "message": message}],
+        "usage": completion["usage"],
+    }
+
+
+def completion_chunks(response: dict, include_usage: bool = False) -> list:
+    """Split a chat completion into stream chunks of roughly one token of text or arguments each."""
+    base = {"id": response["id"], "object": "chat.completion.chunk", "created": response["created"],
+            "model": response["model"]}
+
+    def chunk(delta, finish_reason=None):
+        return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    message = response["choices"][0]["message"]
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    for piece in re.findall(r"\s*\S+|\s+", message.get("content") or ""):
+        chunks.append(chunk({"content": piece}))
+    for index, call in enumerate(message.get("tool_calls") or []):
+        function = call["function"]
+        chunks.append(chunk({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                             "function": {"name": function["name"], "arguments": ""}}]}))
+        arguments = function["arguments"]
+        for start in range(0, len(arguments), 4):
+            chunks.append(chunk({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 4]}}]}))
+    chunks.append(chunk({}, response["choices"][0].get("finish_reason") or "stop"))
+    if include_usage:
+        chunks.append({**base, "choices": [], "usage": response.get("usage")})
+    return chunks
+
+
+def completion_tokens(response: dict) -> int:
+    usage = response.get("usage") or {}
+    return usage.get("completion_tokens") or usage.get("output_tokens") or 0
+
+
+class Recordings:
+    """
+    The recorded sessions: one JSON Lines file per session, with the exchanges in session order.
+    Also remembers which session and position every known Responses API response id belongs to.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.sessions = {}
+        self.response_ids = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+            key = os.path.splitext(os.path.basename(path))[0]
+            with open(path, "r", encoding="utf-8") as f:
+                exchanges = sorted((json.loads(line) for line in f if line.strip()), key=lambda e: e["position"])
+            self.sessions[key] = exchanges
+            for exchange in exchanges:
+                self._remember(key, exchange)
+
+    def _remember(self, key: str, exchange: dict) -> None:
+        if exchange["api"] == "responses":
+            self.response_ids[exchange["response"].get("id")] = (key, exchange["position"])
+
+    def locate(self, request: dict, api: str) -> tuple:
+        """Session key and position of a request."""
+        if api == "chat":
+            return session_key(request, api), chat_position(request)
+        previous = request.get("previous_response_id")
+        if previous in self.response_ids:
+            key, position = self.response_ids[previous]
+            return key, position + 1
+        return session_key(request, api), 0
+
+    def add(self, key: str, exchange: dict) -> None:
+        """Save an exchange; a new recording of a session (position 0) replaces the previous one."""
+        with self._lock:
+            exchanges = self.sessions.setdefault(key, [])
+            if exchange["position"] == 0:
+                exchanges.clear()
+            exchanges.append(exchange)
+            self._remember(key, exchange)
+            mode = "w" if exchange["position"] == 0 else "a"
+            with open(os.path.join(self.directory, f"{key}.jsonl"), mode, encoding="utf-8") as f:
+                f.write(json.dumps(exchange) + "\n")
+
+    def lookup(self, key: str, position: int, api: str):
+        """The recorded response for a position of a session, or None if nothing was recorded for the API."""
+        if key not in self.sessions:
+            candidates = sorted(k for k, exchanges in self.sessions.items() if exchanges and exchanges[0]["api"] == api)
+            if not candidates:
+                return None
+            key = candidates[int(key, 16) % len(candidates)]
+        exchanges = self.sessions[key]
+        return exchanges[min(position, len(exchanges) - 1)]["response"]
+
+
+class Stats:
+    """Request counters of the server, for measuring the throughput of the clients."""
+    def __init__(self):
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.completion_tokens = 0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def end(self, tokens: int):
+        with self._lock:
+            self.active -= 1
+            self.completion_tokens += tokens
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        return (f"{self.requests} requests in {elapsed:.1f} s ({self.requests / elapsed:.2f}/s), "
+                f"{self.completion_tokens} completion tokens, at most {self.max_active} concurrent")
+
+
+def make_handler(recordings: Recordings, stats: Stats, mode: str, upstream: str,
+                 latency: float, token_rate: float):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") == "/v1/models":
+                models = sorted({exchange["request"].get("model") for exchanges in recordings.sessions.values()
+                                 for exchange in exchanges})
+                self.send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in models]})
+            else:
+                self.send_error_json(404, f"Unknown endpoint {self.path}")
+
+        def do_POST(self):
+            api = ENDPOINTS.get(self.path.split("?")[0].rstrip("/"))
+            if api is None:
+                self.send_error_json(404, f"Unknown endpoint {self.path}")
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            stats.begin()
+            tokens = 0
+            try:
+                if mode == "record":
+                    tokens = self.record(api, request)
+                else:
+                    tokens = self.replay(api, request)
+            finally:
+                stats.end(tokens)
+
+        def record(self, api: str, request: dict) -> int:
+            key, position = recordings.locate(request, api)
+            upstream_request = urllib.request.Request(
+                upstream.rstrip("/") + self.path[len("/v1"):],
+                data=json.dumps(request).encode("utf-8"),
+                headers={name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)},
+            )
+            start = time.perf_counter()
+            try:
+                upstream_response = urllib.request.urlopen(upstream_request)
+            except urllib.error.HTTPError as e:
+                body = e.read()
+                self.send_raw(e.code, "application/json", body)
+                return 0
+
+            if request.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                chunks = []
+                for line in upstream_response:
+                    self.wfile.write(line)
+                    self.wfile.flush()
+                    data = line.decode("utf-8").strip()
+                    if data.startswith("data:") and data[5:].strip() != "[DONE]":
+                        chunks.append(json.loads(data[5:]))
+                response = assemble_chunks(chunks) if api == "chat" else None
+            else:
+                body = upstream_response.read()
+                self.send_raw(200, "application/json", body)
+                response = json.loads(body)
+
+            if response is None:
+                print(f"Streamed {api} responses are forwarded but not recorded")
+                return 0
+            recordings.add(key, {
+                "api": api,
+                "position": position,
+                "request": request,
+                "response": response,
+                "elapsed_s": round(time.perf_counter() - start, 3),
+            })
+            print(f"Recorded {api} session {key} position {position}")
+            return completion_tokens(response)
+
+        def replay(self, api: str, request: dict) -> int:
+            key, position = recordings.locate(request, api)
+            response = recordings.lookup(key, position, api)
+            if response is None:
+                self.send_error_json(404, f"No recorded {api} sessions")
+                return 0
+            tokens = completion_tokens(response)
+            generation_time = tokens / token_rate if token_rate else 0.0
+            time.sleep(latency)
+
+            if request.get("stream") and api == "chat":
+                include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+                chunks = completion_chunks(response, include_usage)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in chunks:
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(generation_time / len(chunks))
+                self.wfile.write(b"data: [DONE]\n\n")
+            elif request.get("stream"):
+                self.send_error_json(400, "Streaming is only replayed for chat completions")
+                return 0
+            else:
+                time.sleep(generation_time)
+                self.send_json(200, response)
+            return tokens
+
+        def send_json(self, status: int, payload: dict):
+            self.send_raw(status, "application/json", json.dumps(payload).encode("utf-8"))
+
+        def send_error_json(self, status: int, message: str):
+            self.send_json(status, {"error": {"message": message, "type": "invalid_request_error"}})
+
+        def send_raw(self, status: int, content_type: str, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockOpenAIHandler
+
+
+class MockOpenAIServer:
+    """
+    Runs the recording or replaying server on a background thread.
+    `base_url` is what the OpenAI clients take as their base URL.
+    """
+    def __init__(self, recordings_dir: str, mode: str = "replay", port: int = 0, upstream: str = UPSTREAM_URL,
+                 latency: float = 0.0, token_rate: float = 0.0):
+        self.recordings = Recordings(recordings_dir)
+        self.stats = Stats()
+        handler = make_handler(self.recordings, self.stats, mode, upstream, latency, token_rate)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible server that records and replays sessions")
+    parser.add_argument("mode", choices=("record", "replay"))
+    parser.add_argument("--recordings", type=str, default="recordings", help="Directory of the recorded sessions")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--upstream", type=str, default=UPSTREAM_URL, help="API that requests are forwarded to when recording")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before a replayed response starts")
+    parser.add_argument("--token-rate", type=float, default=0.0,
+                        help="Completion tokens per second of replayed responses; 0 sends them at once")
+    args = parser.parse_args()
+    with MockOpenAIServer(args.recordings, args.mode, args.port, args.upstream, args.latency, args.token_rate) as server:
+        print(f"{args.mode.title()}ing {len(server.recordings.sessions)} sessions on {server.base_url}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            print(f"\n{server.stats.report()}")
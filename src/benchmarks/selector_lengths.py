@@ -0,0 +1,52 @@
+"""
+Compares the selectors of the in-page selector engine with the naive selector builder.
+
+For every interactive element, both selectors are computed and checked for how many elements
+they match. Reports the mean selector length and the share of selectors matching exactly one
+element, on synthetic pages and optionally on real pages.
+
+Run with:
+python selector_lengths.py [--sizes 100 1000] [--url http://172.17.100.121/zm] [--output results.json]
+"""
+import argparse
+import json
+from playwright.sync_api import sync_playwright
+from playbookgen.utils.browser_helpers import compare_selectors
+from dom_extraction import build_synthetic_page
+
+
+def run_comparison(sizes, urls) -> list:
+    results = []
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        page = browser.new_page()
+        for size in sizes:
+            page.set_content(build_synthetic_page(size))
+            results.append({"page": f"synthetic-{size}", **compare_selectors(page)})
+        for url in urls:
+            page.goto(url, wait_until="domcontentloaded")
+            results.append({"page": url, **compare_selectors(page)})
+        browser.close()
+    return results
+
+
+def print_results(results: list) -> None:
+    print(f"{'page':<40} {'elements':>8} {'unique len':>11} {'naive len':>10} {'unique 1:1':>11} {'naive 1:1':>10}")
+    for row in results:
+        print(f"{row['page'][:40]:<40} {row['elements']:>8} {row['unique_mean_length']:>11.1f} "
+              f"{row['naive_mean_length']:>10.1f} {row['unique_exact_share']:>10.0%} {row['naive_exact_share']:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare selector engine and naive selector lengths")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100, 1000],
+                        help="Number of interactive elements in each synthetic page")
+    parser.add_argument("--url", dest="urls", action="append", default=[], help="Real page to compare on")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Optional path to write JSON results")
+    args = parser.parse_args()
+
+    results = run_comparison(args.sizes, args.urls)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
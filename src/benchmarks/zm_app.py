@@ -0,0 +1,160 @@
+"""
+A small local stand-in for the ZoneMinder web interface, for offline benchmarks.
+
+Serves a login form, a console with a nav bar and a table of monitors, an options page with
+tabs and a log page, similar to the pages visited in playbooks/manual/admin1.yml. The number of
+monitors and log rows can be raised to produce larger DOMs.
+
+Run standalone with:
+python zm_app.py [--port 8080] [--monitors 100]
+"""
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+NAV_ITEMS = ["Console", "Montage", "Montage Review", "Events", "Options", "Log", "Groups", "Filters"]
+OPTION_TABS = ["System", "Config", "Servers", "Paths", "Web", "Images", "Logging", "Network", "Mail", "Users"]
+
+
+def page(title: str, body: str) -> str:
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>ZM - {title}</title></head><body>{body}</body></html>"
+    )
+
+
+def nav_bar() -> str:
+    links = "".join(
+        f"<li class='nav-item'><a class='nav-link' href='?view={item.lower().replace(' ', '')}'>{item}</a></li>"
+        for item in NAV_ITEMS
+    )
+    return (
+        "<nav class='navbar navbar-expand-md'><ul class='navbar-nav'>"
+        f"{links}</ul><form method='get' action='/zm/'>"
+        "<button type='submit' name='action' value='logout' class='btn btn-secondary'>Logout</button>"
+        "</form></nav>"
+    )
+
+
+def login_page() -> str:
+    return page("Login", (
+        "<div id='loginform'><form class='center-block' method='get' action='/zm/'>"
+        "<input type='hidden' name='view' value='console'>"
+        "<label for='inputUsername'>Username</label>"
+        "<input type='text' id='inputUsername' name='username' class='form-control' autocomplete='off'>"
+        "<label for='inputPassword'>Password</label>"
+        "<input type='password' id='inputPassword' name='password' class='form-control'>"
+        "<button type='submit' class='btn btn-primary'>Login</button>"
+        "</form></div>"
+    ))
+
+
+def console_page(monitors: int) -> str:
+    rows = "".join(
+        f"<tr><td><a href='?view=watch&mid={i}'>Monitor-{i}</a></td>"
+        f"<td><a href='?view=events&mid={i}'>{i * 7 % 113}</a></td>"
+        f"<td><input type='checkbox' name='markMids[]' value='{i}'></td>"
+        f"<td><button type='button' class='btn btn-sm'>Edit</button></td></tr>"
+        for i in range(1, monitors + 1)
+    )
+    return page("Console", (
+        f"{nav_bar()}<div id='content'><button id='addBtn' class='btn'>Add</button>"
+        f"<table id='consoleTable' class='table'><tbody>{rows}</tbody></table></div>"
+    ))
+
+
+def options_page(tab: str) -> str:
+    tabs = "".join(
+        f"<li class='nav-item'><a class='nav-link{' active' if name.lower() == tab else ''}' "
+        f"href='?view=options&tab={name.lower()}'>{name}</a></li>"
+        for name in OPTION_TABS
+    )
+    fields = "".join(
+        f"<tr><td>{tab.upper()}_OPTION_{i}</td><td><input type='text' name='newConfig[{tab.upper()}_{i}]' "
+        f"value='{i}' class='form-control'></td></tr>"
+        for i in range(1, 16)
+    )
+    return page("Options", (
+        f"{nav_bar()}<ul class='nav nav-pills' id='optionsTabs'>{tabs}</ul>"
+        f"<form method='get' action='/zm/'><table class='table'>{fields}</table>"
+        "<button type='submit' value='Save' class='btn btn-primary'>Save</button></form>"
+    ))
+
+
+def log_page(rows: int) -> str:
+    lines = "".join(
+        f"<tr><td>2025-04-24 10:{i % 60:02d}:00</td><td>zmc</td><td>{['INF', 'WAR', 'ERR'][i % 3]}</td>"
+        f"<td>Message {i}</td></tr>"
+        for i in range(rows)
+    )
+    return page("Log", (
+        f"{nav_bar()}<div id='logs'><select id='filterLevel' name='level'><option>All</option>"
+        "<option>Warning</option><option>Error</option></select>"
+        "<button id='exportButton' class='btn'>Export</button>"
+        f"<table id='logTable' class='table'><tbody>{lines}</tbody></table></div>"
+    ))
+
+
+def make_handler(monitors: int, log_rows: int):
+    class ZoneMinderHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.startswith("/zm"):
+                self.send_error(404)
+                return
+            query = parse_qs(url.query)
+            view = query.get("view", ["login"])[0]
+            if view == "console":
+                body = console_page(monitors)
+            elif view == "options":
+                body = options_page(query.get("tab", ["system"])[0])
+            elif view == "log":
+                body = log_page(log_rows)
+            elif view in ("watch", "events", "montage", "montagereview", "groups", "filters"):
+                body = page(view.title(), f"{nav_bar()}<div id='content'><button id='liveButton'>Live</button></div>")
+            else:
+                body = login_page()
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ZoneMinderHandler
+
+
+class ZoneMinderApp:
+    """Runs the stand-in app on a background thread. `base_url` points at its /zm/ entry page."""
+    def __init__(self, port: int = 0, monitors: int = 50, log_rows: int = 200):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(monitors, log_rows))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/zm/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ZoneMinder stand-in")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--monitors", type=int, default=50)
+    parser.add_argument("--log-rows", type=int, default=200)
+    args = parser.parse_args()
+    with ZoneMinderApp(args.port, args.monitors, args.log_rows) as app:
+        print(f"Serving on {app.base_url}")
+        app.thread.join()
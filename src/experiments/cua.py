@@ -2,14 +2,29 @@
 Tutorial from: https://platform.openai.com/docs/guides/tools-computer-use
 Run docker container with:
 docker run --rm -it --name cua-image -p 5900:5900 -e DISPLAY=:99 cua-image
+
+All commands go through one persistent shell in the container. With --local they run in a local
+shell instead, e.g. against an Xvfb display on :99.
 """
+import io
 import os
+import re
 import time
-import base64
+import uuid
+import shlex
+import atexit
+import hashlib
+import binascii
+import argparse
 import subprocess
 import openai
 from dotenv import load_dotenv
 
+try:
+    from PIL import Image
+except ImportError:  # without Pillow, ImageMagick scales and encodes the screenshots in the container
+    Image = None
+
 
 ###############################################################################
 # 1) Configure environment and OpenAI credentials
@@ -22,20 +37,96 @@ DOCKER_CONTAINER_NAME = "cua-image"
 # The X display inside the Docker container
 DOCKER_DISPLAY = ":99"
 
+# Size of the X screen; the model is told the size of the (possibly downscaled) screenshots
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 800
+
 ###############################################################################
-# 2) Helper function to run commands inside Docker
+# 2) Persistent shell channel into the Docker container
 ###############################################################################
 
-def docker_exec(cmd: str, decode=True) -> str:
+class ShellChannel:
+    """
+    One long-lived shell in the container (`docker exec -i ... sh`), or a local `sh` when
+    `container` is None, that all commands are written to. The output of every command is
+    framed by a random sentinel line that carries its exit code, so no process is spawned per
+    action. The shell is restarted if it has exited.
+    """
+    def __init__(self, container=DOCKER_CONTAINER_NAME, display=DOCKER_DISPLAY):
+        self.container = container
+        self.display = display
+        self.process = None
+        self.sentinel = f"__CUA_DONE_{uuid.uuid4().hex}__".encode()
+
+    def start(self):
+        shell = ["docker", "exec", "-i", self.container, "sh"] if self.container else ["sh"]
+        self.process = subprocess.Popen(shell, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.process.stdin.write(f"export DISPLAY={self.display}\n".encode())
+
+    def close(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        self.process = None
+
+    def run(self, cmd: str) -> bytes:
+        """Run `cmd` in the shell and return its stdout; raises CalledProcessError on a non-zero exit code."""
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        frame = f"{cmd}\nprintf '\\n%s %d\\n' '{self.sentinel.decode()}' $?\n"
+        self.process.stdin.write(frame.encode())
+        self.process.stdin.flush()
+
+        marker = b"\n" + self.sentinel + b" "
+        buffer = bytearray()
+        searched = 0
+        fd = self.process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                # reap the dead shell so that the next command starts a fresh one
+                self.process.stdout.close()
+                try:
+                    self.process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                self.process.wait()
+                self.process = None
+                raise RuntimeError(f"Shell exited while running: {cmd}")
+            buffer += chunk
+            index = buffer.find(marker, max(0, searched - len(marker)))
+            searched = len(buffer)
+            if index != -1 and buffer.find(b"\n", index + len(marker)) != -1:
+                break
+        end = buffer.find(b"\n", index + len(marker))
+        returncode = int(buffer[index + len(marker):end])
+        output = bytes(buffer[:index])
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, output)
+        return output
+
+
+shell_channel = ShellChannel()
+atexit.register(shell_channel.close)
+
+
+def docker_exec(cmd: str) -> str:
     """
     Executes 'cmd' inside your Docker container and returns stdout.
     """
-    safe_cmd = cmd.replace('"', '\\"')
-    docker_cmd = f'docker exec {DOCKER_CONTAINER_NAME} sh -c "{safe_cmd}"'
-    output = subprocess.check_output(docker_cmd, shell=True)
-    if decode:
-        return output.decode("utf-8", errors="ignore")
-    return output
+    return docker_exec_bytes(cmd).decode("utf-8", errors="ignore")
+
+
+def docker_exec_bytes(cmd: str) -> bytes:
+    """
+    Executes 'cmd' inside your Docker container and returns stdout as raw bytes (e.g. images).
+    """
+    return shell_channel.run(cmd)
+
+
+def xdotool(*operations: str) -> str:
+    """Run several xdotool operations (e.g. "mousemove 10 20", "click 1") in a single invocation."""
+    return docker_exec("xdotool " + " ".join(operations))
 
 ###############################################################################
 # 3) Function to handle model actions in the Docker environment
@@ -49,55 +140,47 @@ def handle_model_action(action):
     action_type = action.type
 
     if action_type == "click":
-        x = action.x
-        y = action.y
+        x, y = screenshots.to_screen(action.x, action.y)
         button_name = action.button
         button_map = {"left": 1, "middle": 2, "right": 3}
         button = button_map.get(button_name, 1)
         print(f"--> Action: click at ({x}, {y}) with button '{button_name}'")
-        docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool mousemove {x} {y} click {button}')
+        xdotool(f"mousemove {x} {y}", f"click {button}")
 
     elif action_type == "keypress":
-        # 'keys' should be a list of strings
+        # 'keys' should be a list of strings, sent as one xdotool key invocation
         keys = action.keys
-        for key in keys:
-            print(f"--> Action: keypress '{key}'")
-            upper_k = key.upper()
-            if upper_k == "ENTER":
-                docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool key Return')
-            elif upper_k == "SPACE":
-                docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool key space')
-            else:
-                docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool key {key}')
+        print(f"--> Action: keypress {keys}")
+        key_map = {"ENTER": "Return", "SPACE": "space"}
+        xdotool("key " + " ".join(shlex.quote(key_map.get(key.upper(), key)) for key in keys))
 
     elif action_type == "type":
         # 'text' should be a string
         text = action.text
         print(f"--> Action: type text '{text}'")
-        docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool type \'{text}\'')
+        xdotool(f"type -- {shlex.quote(text)}")
 
     elif action_type == "scroll":
-        x = action.x
-        y = action.y
+        x, y = screenshots.to_screen(action.x, action.y)
         scroll_x = action.scrollX
         scroll_y = action.scrollY
         print(f"--> Action: scroll at ({x}, {y}), scrollX={scroll_x}, scrollY={scroll_y}")
 
-        # Move mouse
-        docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool mousemove {x} {y}')
+        # Move mouse and scroll in one invocation
+        operations = [f"mousemove {x} {y}"]
 
         # Vertical scroll: xdotool uses button 4=up, 5=down
         if scroll_y != 0:
             button = 4 if scroll_y < 0 else 5
             clicks = abs(scroll_y)
-            for _ in range(clicks):
-                docker_exec(f'DISPLAY={DOCKER_DISPLAY} xdotool click {button}')
+            operations.append(f"click --repeat {clicks} --delay 0 {button}")
 
         # Horizontal scrolling is trickier, typically not used in a minimal example
+        xdotool(*operations)
 
     elif action_type == "wait":
-        print("--> Action: wait (2s)")
-        time.sleep(2)
+        # the loop waits for the screen to settle after every action
+        print("--> Action: wait (until the screen settles)")
 
     elif action_type == "screenshot":
         print("--> Action: screenshot (no-op here)")
@@ -109,14 +192,169 @@ def handle_model_action(action):
 # 4) Screenshot function
 ###############################################################################
 
-def take_screenshot() -> bytes:
+class Base64Buffer:
     """
-    Capture a screenshot from the container (the entire X screen).
+    Base64 encoder that writes into one buffer, which is reused for every frame and only replaced
+    when a frame needs more room. The input is encoded in chunks whose size is a multiple of 3, so
+    no full-size intermediate copy is made.
     """
-    cmd = f'DISPLAY={DOCKER_DISPLAY} import -window root png:-'
-    # decode=False means we get raw bytes
-    screenshot_bytes = docker_exec(cmd, decode=False)
-    return screenshot_bytes
+    CHUNK_SIZE = 3 * 16384
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def encode(self, data) -> memoryview:
+        data = memoryview(data).cast("B")
+        size = 4 * ((len(data) + 2) // 3)
+        if len(self.buffer) < size:
+            self.buffer = bytearray(size)
+        written = 0
+        for start in range(0, len(data), self.CHUNK_SIZE):
+            encoded = binascii.b2a_base64(data[start:start + self.CHUNK_SIZE], newline=False)
+            self.buffer[written:written + len(encoded)] = encoded
+            written += len(encoded)
+        return memoryview(self.buffer)[:written]
+
+
+class ScreenshotPipeline:
+    """
+    Captures the screen once per step as a raw PPM frame and hashes it (with the same hash as
+    `SettleDetector`, so a settled screen needs no capture at all). If the frame equals the
+    previous one, the previous data URL is sent again without encoding; otherwise the frame is
+    scaled to `width` and encoded as `image_format` with Pillow into a reused buffer. Without
+    Pillow, ImageMagick scales and encodes the frame in the container and the encoded image is
+    hashed instead. Click and scroll coordinates of the model are scaled back with `to_screen`.
+    """
+    MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+    PPM_HEADER = re.compile(rb"P6\s+(\d+)\s+(\d+)\s+255\s")
+
+    def __init__(self, width=SCREEN_WIDTH, image_format="png", quality=80):
+        self.width = width
+        self.height = round(SCREEN_HEIGHT * width / SCREEN_WIDTH)
+        self.image_format = image_format
+        self.quality = quality
+        self.image_buffer = io.BytesIO()
+        self.base64 = Base64Buffer()
+        self.last_hash = None
+        self.last_url = None
+        self.frames = 0
+        self.unchanged = 0
+        self.upload_bytes = 0
+
+    def to_screen(self, x, y):
+        """Screen coordinates of a point in the screenshot."""
+        return round(x * SCREEN_WIDTH / self.width), round(y * SCREEN_HEIGHT / self.height)
+
+    def capture(self) -> bytes:
+        if Image is None:
+            resize = f"-resize {self.width}x{self.height}! " if self.width != SCREEN_WIDTH else ""
+            return docker_exec_bytes(f"import -window root {resize}-quality {self.quality} {self.image_format}:-")
+        return docker_exec_bytes("import -window root -depth 8 ppm:-")
+
+    def encode(self, frame: bytes):
+        """Scale and encode a raw PPM frame into `image_buffer`."""
+        header = self.PPM_HEADER.match(frame)
+        if header is None:
+            raise ValueError(f"Expected a binary PPM (P6) frame from ImageMagick, got {bytes(frame[:16])!r}")
+        size = (int(header.group(1)), int(header.group(2)))
+        if len(frame) - header.end() < size[0] * size[1] * 3:
+            raise ValueError(f"Truncated PPM frame: {len(frame) - header.end()} bytes of pixels for {size[0]}x{size[1]}")
+        image = Image.frombuffer("RGB", size, memoryview(frame)[header.end():], "raw", "RGB", 0, 1)
+        if size != (self.width, self.height):
+            image = image.resize((self.width, self.height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        self.image_buffer.seek(0)
+        self.image_buffer.truncate()
+        image.save(self.image_buffer, format=self.image_format, quality=self.quality)
+
+    def data_url(self, image) -> str:
+        return f"data:{self.MIME_TYPES[self.image_format]};base64," + str(self.base64.encode(image), "ascii")
+
+    def screenshot(self, screen_hash=None) -> str:
+        """
+        Capture the screen and return it as a data URL, printing the upload size and timings.
+        `screen_hash` is a `SettleDetector` hash of the current screen; if it matches the previous
+        frame, the capture is skipped as well.
+        """
+        start = time.perf_counter()
+        if Image is not None and screen_hash is not None and screen_hash == self.last_hash:
+            frame, digest = None, screen_hash
+        else:
+            frame = self.capture()
+            digest = hashlib.md5(frame).hexdigest()
+        captured = time.perf_counter()
+        unchanged = digest == self.last_hash
+        if not unchanged:
+            if Image is None:
+                self.last_url = self.data_url(frame)
+            else:
+                self.encode(frame)
+                with self.image_buffer.getbuffer() as image:
+                    self.last_url = self.data_url(image)
+            self.last_hash = digest
+        encoded = time.perf_counter()
+
+        self.frames += 1
+        self.unchanged += unchanged
+        self.upload_bytes += len(self.last_url)
+        print(f"--> Screenshot {self.width}x{self.height} {self.image_format}: "
+              f"{len(self.last_url) / 1024:.1f} kB upload, capture {(captured - start) * 1000:.0f} ms, "
+              f"encode {(encoded - captured) * 1000:.0f} ms" + (" (unchanged, reused)" if unchanged else ""))
+        return self.last_url
+
+
+screenshots = ScreenshotPipeline()
+
+
+class SettleDetector:
+    """
+    Waits for the UI to settle after an action instead of sleeping a fixed time: the screen is
+    hashed every `poll_interval` seconds until it has not changed for `stable_time` seconds, or
+    until `timeout` seconds have passed. The raw frame is hashed in the container, so only the
+    digest is transferred per poll.
+    """
+    def __init__(self, stable_time=0.3, poll_interval=0.1, timeout=5.0):
+        self.stable_time = stable_time
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.total_wait = 0.0
+
+    def frame_hash(self) -> str:
+        return docker_exec("import -window root -depth 8 ppm:- | md5sum").split()[0]
+
+    def wait(self, stable_time=None) -> str:
+        """Block until the screen is stable and return its hash; the wait is printed."""
+        stable_time = self.stable_time if stable_time is None else stable_time
+        start = time.perf_counter()
+        current = self.frame_hash()
+        stable_since = time.perf_counter()
+        polls = 1
+        while True:
+            now = time.perf_counter()
+            if now - stable_since >= stable_time or now - start >= self.timeout:
+                break
+            time.sleep(self.poll_interval)
+            polls += 1
+            frame_hash = self.frame_hash()
+            if frame_hash != current:
+                current = frame_hash
+                stable_since = time.perf_counter()
+        waited = time.perf_counter() - start
+        self.total_wait += waited
+        settled = now - stable_since >= stable_time
+        print(f"--> {'Settled' if settled else 'Not settled (timeout)'} after {waited:.2f} s, {polls} polls")
+        return current
+
+
+settle = SettleDetector()
+
+
+def computer_tool() -> dict:
+    return {
+        "type": "computer_use_preview",
+        "display_width": screenshots.width,
+        "display_height": screenshots.height,
+        "environment": "linux"  # must be one of 'windows', 'mac', 'linux', 'browser'
+    }
 
 ###############################################################################
 # 5) Main loop that sends instructions to the model and handles responses
@@ -142,14 +380,7 @@ def run_cua_demo():
 
     response = openai.responses.create(
         model="computer-use-preview",
-        tools=[
-            {
-                "type": "computer_use_preview",
-                "display_width": 1280,
-                "display_height": 800,
-                "environment": "linux"  # must be one of 'windows', 'mac', 'linux', 'browser'
-            }
-        ],
+        tools=[computer_tool()],
         input=conversation_input,
         truncation="auto",
     )
@@ -166,6 +397,8 @@ def run_cua_demo():
                 if item.type == "message":
                     # Print the model's text message
                     print(item.content)
+            print(f"{screenshots.frames} screenshots ({screenshots.unchanged} unchanged), "
+                  f"{screenshots.upload_bytes / 1024:.1f} kB uploaded, {settle.total_wait:.1f} s waiting for the UI")
             break
 
         # In many workflows, you’d handle each computer call one by one.
@@ -191,12 +424,12 @@ def run_cua_demo():
             # 5c) Execute the action
             handle_model_action(action)
 
-            # 5d) Wait a moment for UI to update
-            time.sleep(1)
+            # 5d) Wait until the UI has settled; the model asks to wait when something is still
+            # loading, so then the screen must stay unchanged for longer
+            screen_hash = settle.wait(max(1.0, settle.stable_time) if action.type == "wait" else None)
 
-            # 5e) Take a screenshot
-            screenshot_bytes = take_screenshot()
-            screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
+            # 5e) Take a screenshot (re-encoded only if the screen changed)
+            screenshot_url = screenshots.screenshot(screen_hash)
 
             # 5f) Create the next input containing that screenshot
             next_input = {
@@ -204,7 +437,7 @@ def run_cua_demo():
                 "type": "computer_call_output",
                 "output": {
                     "type": "input_image",
-                    "image_url": f"data:image/png;base64,{screenshot_b64}"
+                    "image_url": screenshot_url
                 },
                 "acknowledged_safety_checks": acknowledged_safety_checks,
                 # Optionally "current_url": "...",
@@ -214,17 +447,28 @@ def run_cua_demo():
             response = openai.responses.create(
                 model="computer-use-preview",
                 previous_response_id=response.id,
-                tools=[
-                    {
-                        "type": "computer_use_preview",
-                        "display_width": 1280,
-                        "display_height": 800,
-                        "environment": "linux"
-                    }
-                ],
+                tools=[computer_tool()],
                 input=[next_input],
                 truncation="auto",
             )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computer-use demo driving a Docker desktop")
+    parser.add_argument("--container", default=DOCKER_CONTAINER_NAME, help="Container to run the commands in")
+    parser.add_argument("--local", action="store_true",
+                        help="Run the commands in a local shell instead of the container (e.g. with Xvfb on DISPLAY)")
+    parser.add_argument("--screenshot-width", type=int, default=SCREEN_WIDTH,
+                        help="Width the screenshots are scaled to (the height keeps the aspect ratio)")
+    parser.add_argument("--screenshot-format", choices=("png", "jpeg", "webp"), default="png")
+    parser.add_argument("--screenshot-quality", type=int, default=80, help="Quality of jpeg and webp screenshots")
+    parser.add_argument("--settle-time", type=float, default=0.3,
+                        help="Seconds the screen must stay unchanged before the next screenshot")
+    parser.add_argument("--settle-poll", type=float, default=0.1, help="Seconds between screen hashes")
+    parser.add_argument("--settle-timeout", type=float, default=5.0, help="Longest wait for the screen to settle")
+    args = parser.parse_args()
+    if Image is None:
+        print("Pillow is not installed; ImageMagick scales and encodes the screenshots in the container")
+    shell_channel.container = None if args.local else args.container
+    screenshots = ScreenshotPipeline(args.screenshot_width, args.screenshot_format, args.screenshot_quality)
+    settle = SettleDetector(args.settle_time, args.settle_poll, args.settle_timeout)
     run_cua_demo()
@@ -0,0 +1,236 @@
+"""
+Non-interactive batch generation of playbooks.
+
+Every prompt file is sent as the user message of its own generation (with its own browser
+sessions and playbook state), and several generations run concurrently in one process sharing
+a single browser. One YAML playbook is written per prompt, plus a summary.json with the wall
+time, completions and tokens of each job.
+
+Run with:
+python batch.py ../../prompts --workers 4 --output-dir ../../playbooks/llm/batch
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Optional
+from playbookgen.main import Generation, run_full_turn, build_system_message
+from playbookgen.utils.browser_pool import (
+    BrowserPool, NavigationPolicy, BLOCKABLE_RESOURCE_TYPES, session_navigation,
+    navigation_spec, session_navigation_spec
+)
+from playbookgen.utils.completion_cache import CompletionCache
+from playbookgen.utils.doc_index import DocIndex, load_or_build
+from playbookgen.utils.context_compaction import ContextCompactor
+from playbookgen.utils.snapshot_format import SnapshotFormatter, SNAPSHOT_FORMATS
+from playbookgen.utils.tracing import tracer
+from playbookgen.utils.yaml_writer import extract_yaml_from_messages, write_playbook_to_file
+
+
+def collect_files(sources: list, pattern: str = "*.txt") -> list:
+    """
+    Expand the given directories (all files matching `pattern` in them), glob patterns and file
+    paths into a sorted list of files without duplicates.
+    """
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, pattern))
+        else:
+            matches = glob.glob(source)
+        files.extend(os.path.abspath(match) for match in matches if os.path.isfile(match))
+    return sorted(set(files))
+
+
+def output_paths(prompt_files: list, output_dir: str) -> dict:
+    """Map every prompt file to its playbook path, numbering prompts that share a file name."""
+    paths = {}
+    used = set()
+    for prompt_file in prompt_files:
+        stem = os.path.splitext(os.path.basename(prompt_file))[0]
+        name, counter = stem, 1
+        while name in used:
+            counter += 1
+            name = f"{stem}_{counter}"
+        used.add(name)
+        paths[prompt_file] = os.path.join(output_dir, f"{name}.yml")
+    return paths
+
+
+async def run_job(
+        prompt_file: str,
+        output_file: str,
+        browser_pool: BrowserPool,
+        semaphore: asyncio.Semaphore,
+        snapshot_format: str,
+        token_budget: Optional[int],
+        max_sessions: int,
+        cache: Optional[CompletionCache] = None,
+        keep_snapshots: int = 3,
+        context_ceiling: Optional[int] = None,
+        doc_index: Optional[DocIndex] = None,
+        docs_top_k: int = 0,
+        navigation: Optional[NavigationPolicy] = None,
+        session_policies: Optional[dict] = None
+) -> dict:
+    """Generate the playbook for one prompt file and return its summary row."""
+    with open(prompt_file, "r", encoding="utf-8") as f:
+        prompt = f.read().strip()
+
+    result = {"prompt": prompt_file, "output": output_file, "status": "ok", "error": None}
+    usage = {"completions": 0, "cached_completions": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    async with semaphore:
+        # each job is its own task, so its spans get their own track in the trace
+        tracer.set_track(os.path.basename(prompt_file))
+        generation = Generation(
+            browser_pool,
+            snapshot_formatter=SnapshotFormatter(snapshot_format, token_budget),
+            max_sessions=max_sessions,
+            elements_file=None,
+            navigation=navigation,
+            session_navigation=session_policies,
+        )
+        start = time.perf_counter()
+        try:
+            messages = [{"role": "user", "content": prompt}]
+            _, yml_msg = await run_full_turn(
+                build_system_message(prompt, doc_index, docs_top_k), generation.tools, messages, usage=usage, cache=cache,
+                compactor=ContextCompactor(keep_snapshots, context_ceiling),
+            )
+            yaml_text = extract_yaml_from_messages(yml_msg)
+            if yaml_text is None:
+                yaml_text = generation.playbook_state.to_yaml()
+            write_playbook_to_file(yaml_text, output_file)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+        finally:
+            await generation.close()
+        result["wall_time_s"] = round(time.perf_counter() - start, 3)
+
+    result["steps"] = len(generation.playbook_state.commands)
+    result.update(usage)
+    return result
+
+
+async def run_batch(
+        prompt_files: list,
+        output_dir: str,
+        workers: int = 4,
+        snapshot_format: str = "compact",
+        token_budget: Optional[int] = None,
+        max_sessions: int = 4,
+        cache: Optional[CompletionCache] = None,
+        keep_snapshots: int = 3,
+        context_ceiling: Optional[int] = None,
+        doc_index: Optional[DocIndex] = None,
+        docs_top_k: int = 0,
+        navigation: Optional[NavigationPolicy] = None,
+        session_policies: Optional[dict] = None
+) -> list:
+    """Run one generation per prompt file, at most `workers` at a time, and return the summary rows."""
+    browser_pool = BrowserPool()
+    semaphore = asyncio.Semaphore(workers)
+    paths = output_paths(prompt_files, output_dir)
+    try:
+        return await asyncio.gather(*(
+            run_job(prompt_file, paths[prompt_file], browser_pool, semaphore,
+                    snapshot_format, token_budget, max_sessions, cache, keep_snapshots, context_ceiling,
+                    doc_index, docs_top_k, navigation, session_policies)
+            for prompt_file in prompt_files
+        ))
+    finally:
+        await browser_pool.close()
+
+
+def print_summary(results: list, wall_time: float) -> None:
+    print(f"\n{'prompt':<30} {'status':<7} {'time (s)':>9} {'compl.':>7} {'prompt tok':>11} {'compl. tok':>11}")
+    for row in results:
+        name = os.path.basename(row["prompt"])
+        print(f"{name:<30} {row['status']:<7} {row['wall_time_s']:>9.1f} {row['completions']:>7} "
+              f"{row['prompt_tokens']:>11} {row['completion_tokens']:>11}")
+        if row["error"]:
+            print(f"    error: {row['error']}")
+    total_tokens = sum(row["prompt_tokens"] + row["completion_tokens"] for row in results)
+    print(f"{len(results)} playbooks in {wall_time:.1f} s, {total_tokens} tokens in total")
+
+
+def main(sources: list, output_dir: str, workers: int, snapshot_format: str,
+         token_budget: Optional[int], max_sessions: int, cache_dir: Optional[str] = None,
+         cache_max_mb: float = 256, cache_max_age_days: float = 30,
+         keep_snapshots: int = 3, context_ceiling: Optional[int] = None,
+         trace_file: Optional[str] = None, docs_top_k: int = 0, docs_index: Optional[str] = None,
+         navigation_wait: str = "load", block_resources: tuple = (),
+         session_navigation_specs: Optional[list] = None) -> None:
+    prompt_files = collect_files(sources)
+    if not prompt_files:
+        print("No prompt files found.")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    tracer.enabled = trace_file is not None
+    doc_index = load_or_build(docs_index) if docs_top_k > 0 else None
+    cache = CompletionCache(cache_dir, cache_max_mb, cache_max_age_days) if cache_dir else None
+    navigation = NavigationPolicy.from_spec(navigation_wait, block_resources)
+    session_policies = session_navigation(session_navigation_specs, block_resources)
+    start = time.perf_counter()
+    results = asyncio.run(
+        run_batch(prompt_files, output_dir, workers, snapshot_format, token_budget, max_sessions, cache,
+                  keep_snapshots, context_ceiling, doc_index, docs_top_k, navigation, session_policies)
+    )
+    wall_time = time.perf_counter() - start
+
+    summary_file = os.path.join(output_dir, "summary.json")
+    with open(summary_file, "w") as f:
+        json.dump({"wall_time_s": round(wall_time, 3), "workers": workers, "jobs": results}, f, indent=2)
+    print_summary(results, wall_time)
+    print(f"Summary written to {summary_file}")
+    if cache is not None:
+        print(cache.report())
+    if trace_file:
+        tracer.export_chrome_trace(trace_file)
+        print(f"Trace written to {trace_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PlaybookGen batch generation")
+    parser.add_argument("prompts", nargs="+", help="Prompt files, directories of *.txt prompts or glob patterns")
+    parser.add_argument("--output-dir", "-o", type=str, default="generated",
+                        help="Directory for the generated playbooks and summary.json")
+    parser.add_argument("--workers", "-j", type=int, default=4, help="Number of concurrent generations")
+    parser.add_argument("--snapshot-format", choices=SNAPSHOT_FORMATS, default="compact",
+                        help="Encoding of the interactive element snapshots sent to the model")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="Optional maximum number of tokens per element snapshot")
+    parser.add_argument("--max-sessions", type=int, default=4,
+                        help="Maximum number of open browser sessions per generation")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Optional directory for caching completions; identical requests are answered from disk")
+    parser.add_argument("--cache-max-mb", type=float, default=256,
+                        help="Maximum size of the completion cache; least recently used entries are evicted beyond that")
+    parser.add_argument("--cache-max-age-days", type=float, default=30,
+                        help="Cached completions older than this are discarded")
+    parser.add_argument("--keep-snapshots", type=int, default=3,
+                        help="Number of most recent element snapshots sent verbatim; older ones are summarized")
+    parser.add_argument("--context-ceiling", type=int, default=None,
+                        help="Optional token ceiling per request; recent snapshots are summarized too while above it")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Optional path of a Chrome trace / Perfetto JSON file with one track per job")
+    parser.add_argument("--docs-top-k", type=int, default=0,
+                        help="Add the K sections of the AttackMate docs most relevant to each prompt to the system message")
+    parser.add_argument("--docs-index", type=str, default=None,
+                        help="BM25 index of the docs; built from src/txt-docs if missing")
+    parser.add_argument("--navigation-wait", type=navigation_spec, default="load",
+                        help="What navigations wait for: load, domcontentloaded, networkidle, networkidle:MS or selector:CSS")
+    parser.add_argument("--session-navigation", type=session_navigation_spec, action="append", default=[],
+                        metavar="SESSION=WAIT",
+                        help="Navigation wait of one browser session; can be given several times")
+    parser.add_argument("--block-resources", nargs="*", choices=BLOCKABLE_RESOURCE_TYPES, default=[],
+                        help="Resource types the browser sessions do not load")
+    args = parser.parse_args()
+    main(args.prompts, args.output_dir, args.workers, args.snapshot_format, args.token_budget,
+         args.max_sessions, args.cache_dir, args.cache_max_mb, args.cache_max_age_days, args.keep_snapshots,
+         args.context_ceiling, args.trace, args.docs_top_k, args.docs_index, args.navigation_wait, tuple(args.block_resources),
+         args.session_navigation)
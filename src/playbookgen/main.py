@@ -1,59 +1,49 @@
-from playbookgen.utils.schema import function_to_schema
-from playbookgen.utils.browser_helpers import build_naive_css_selector
+from playbookgen.utils.tool_registry import ToolRegistry, ToolArgumentError
+from playbookgen.utils.dom_tracker import SnapshotTracker
+from playbookgen.utils.browser_pool import (
+    BrowserPool, BrowserSessions, NavigationPolicy, BLOCKABLE_RESOURCE_TYPES, session_navigation,
+    navigation_spec, session_navigation_spec
+)
+from playbookgen.utils.completion_cache import CompletionCache
+from playbookgen.utils.context_compaction import ContextCompactor
+from playbookgen.utils.snapshot_format import SnapshotFormatter, SNAPSHOT_FORMATS, count_tokens
+from playbookgen.utils.doc_index import DocIndex, load_or_build
+from playbookgen.utils.tracing import tracer
 from playbookgen.utils.yaml_writer import extract_yaml_from_messages, write_playbook_to_file
 from playbookgen.system_message import SYSTEM_MESSAGE
-from playwright.sync_api import sync_playwright, Page, ElementHandle
-from typing import Optional
+from typing import Literal, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+import asyncio
 import json
+import time
 import yaml
 import argparse
 
 
 load_dotenv()
-client = OpenAI()
+# created on first use, so that replaying playbooks does not need API credentials
+client: Optional[AsyncOpenAI] = None
+MODEL = "gpt-4.1"
+
+
+def get_client() -> AsyncOpenAI:
+    global client
+    if client is None:
+        client = AsyncOpenAI()
+    return client
 
 
 # -------------------------------------------------------------------------------------
 # Playwright/DOM handling
 # -------------------------------------------------------------------------------------
 
-# store active browser sessions in a dictionary so each "session_id" can track a page/browser.
-browser_sessions = {}
-
-
-def get_interactive_elements(session_id: str, output_file: str = "elements.json") -> str:
-    """
-    Collect interactive elements from current page, save to JSON file, and return results.
-    Returns JSON string of elements or error message if session doesn't exist.
-    """
-    if session_id not in browser_sessions:
-        return "No active session. Create one with 'visit' command first."
-
-    page = browser_sessions[session_id]
-    try:
-        elements = page.query_selector_all("a, button, input, textarea, select")
-        interactive_elements = []
-
-        for idx, elem in enumerate(elements, start=1):
-            css_selector = build_naive_css_selector(elem)
-            interactive_elements.append({
-                "index": idx,
-                "selector": f"css={css_selector}",
-                "tag": elem.evaluate("el => el.tagName"),
-                "text": elem.inner_text().strip(),
-                "type": elem.get_attribute("type"),
-                "id": elem.get_attribute("id"),
-                "class": elem.get_attribute("class")
-            })
-
-        with open(output_file, "w") as f:
-            json.dump(interactive_elements, f, indent=2)
+# browser commands that do_browser_action performs
+BROWSER_COMMANDS = ("visit", "click", "type")
 
-        return json.dumps(interactive_elements, indent=2)
-    except Exception as e:
-        return f"Error collecting elements: {str(e)}"
+# fields of each element that are handed to the model
+SNAPSHOT_FIELDS = ("ref", "index", "selector", "tag", "text", "type", "id", "class")
 
 
 class PlaybookState:
@@ -68,202 +58,519 @@ class PlaybookState:
         return yaml.dump({"commands": self.commands}, sort_keys=False)
 
 
-# Global “playbook” so we can accumulate steps:
-playbook_state = PlaybookState()
-
-
-def add_playbook_step(
-        step_type: str,
-        seconds: Optional[int] = None,
-        cmd: Optional[str] = None,
-        url: Optional[str] = None,
-        selector: Optional[str] = None,
-        text: Optional[str] = None,
-        session: Optional[str] = None,
-        creates_session: Optional[str] = None
-) -> str:
+class Generation:
     """
-    Add a step to the YAML playbook.
-
-    For a sleep step:
-      - Set step_type to "sleep"
-      - Provide the 'seconds' parameter
-
-    For a browser action step:
-      - step_type is typically "browser"
-      - cmd: the action to perform (e.g. "visit", "click", "type")
-      - url: e.g. "https://www.example.com"
-      - selector: e.g. "a[href='/about']"
-      - text: text to type (if cmd=="type")
-      - session: existing browser session name
-      - creates_session: session name if the step creates a new browser context
-
-    The function adds the step to the playbook and, if it's a browser step, executes the browser action.
+    State of one playbook generation: the playbook, the browser sessions and the previous
+    element snapshot of each session. Its tools are handed to the agent as bound methods, so
+    several generations can run side by side in one process.
     """
-    if step_type == "sleep":
-        if seconds is None:
-            raise ValueError("The 'seconds' parameter must be provided for a sleep step.")
+    def __init__(
+            self,
+            browser_pool: BrowserPool,
+            snapshot_formatter: Optional[SnapshotFormatter] = None,
+            max_sessions: int = 4,
+            elements_file: Optional[str] = "elements.json",
+            action_timeout: Optional[float] = None,
+            navigation: Optional[NavigationPolicy] = None,
+            session_navigation: Optional[dict] = None
+    ):
+        self.playbook_state = PlaybookState()
+        # each "session_id" gets its own context and page in the shared browser.
+        self.browser_sessions = BrowserSessions(
+            browser_pool, max_sessions=max_sessions, default_timeout=action_timeout,
+            navigation=navigation, session_navigation=session_navigation
+        )
+        # previous element snapshot of each session, so later snapshots only return what changed
+        self.snapshot_trackers = {}
+        # encodes the snapshots that go back to the model
+        self.snapshot_formatter = snapshot_formatter or SnapshotFormatter()
+        self.elements_file = elements_file
+        # Our tools for the agent to call:
+        self.tools = ToolRegistry([self.get_interactive_elements, self.add_playbook_step])
+
+    async def close(self):
+        await self.browser_sessions.close()
+
+    async def get_interactive_elements(
+            self,
+            session_id: str,
+            output_file: Optional[str] = None,
+            full: bool = False
+    ) -> str:
+        """
+        Collect interactive elements from current page, save to JSON file, and return results.
+        Elements carry stable refs (e.g. "e12"). After the first call on a page only the elements that
+        were added, changed or removed since the previous call are returned; set full to true to get
+        the complete list again. After a navigation the complete list is returned automatically.
+        If a snapshot is cut off at the token budget, call again without full to get the remaining elements.
+        Returns the elements in the configured snapshot format or error message if session doesn't exist.
+        """
+        if session_id not in self.browser_sessions:
+            return self.missing_session_message(session_id)
+
+        page = self.browser_sessions.get_page(session_id)
+        tracker = self.snapshot_trackers.setdefault(session_id, SnapshotTracker())
+        output_file = output_file or self.elements_file
+        try:
+            with tracer.span("extract_elements", "extraction", session=session_id) as span:
+                result = await tracker.snapshot(page, SNAPSHOT_FIELDS, full=full)
+                if span is not None:
+                    span.args.update(full=result["full"], total=result["total"])
+            interactive_elements = tracker.current_elements()
+
+            if output_file:
+                with open(output_file, "w") as f:
+                    json.dump(interactive_elements, f, indent=2)
+
+            if result["full"]:
+                snapshot = self.snapshot_formatter.format(interactive_elements)
+            else:
+                snapshot = self.snapshot_formatter.format_diff(result, interactive_elements)
+            # elements cut off at the token budget count as not sent, so the next snapshot returns them
+            await tracker.forget(page, [elem["ref"] for elem in self.snapshot_formatter.last_omitted])
+            print(self.snapshot_formatter.report())
+            return snapshot
+        except Exception as e:
+            return f"Error collecting elements: {str(e)}"
+
+    async def add_playbook_step(
+            self,
+            step_type: Literal["browser", "sleep"],
+            seconds: Optional[int] = None,
+            cmd: Optional[str] = None,
+            url: Optional[str] = None,
+            selector: Optional[str] = None,
+            text: Optional[str] = None,
+            session: Optional[str] = None,
+            creates_session: Optional[str] = None
+    ) -> str:
+        """
+        Add a step to the YAML playbook.
+
+        For a sleep step:
+          - Set step_type to "sleep"
+          - Provide the 'seconds' parameter
+
+        For a browser action step:
+          - step_type is typically "browser"
+          - cmd: the action to perform (e.g. "visit", "click", "type")
+          - url: e.g. "https://www.example.com"
+          - selector: e.g. "a[href='/about']"
+          - text: text to type (if cmd=="type")
+          - session: existing browser session name
+          - creates_session: session name if the step creates a new browser context
+
+        The function adds the step to the playbook and, if it's a browser step, executes the browser action.
+        """
+        if step_type == "sleep":
+            if seconds is None:
+                raise ValueError("The 'seconds' parameter must be provided for a sleep step.")
+            step = {
+                "type": "sleep",
+                "seconds": seconds
+            }
+            self.playbook_state.add_step(step)
+            return f"Added sleep step to the playbook:\n{yaml.dump(step, sort_keys=False)}"
+
+        # For non-sleep steps (browser actions)
+        if cmd is None:
+            raise ValueError("The 'cmd' parameter must be provided for a browser step.")
+
         step = {
-            "type": "sleep",
-            "seconds": seconds
+            "type": step_type,
+            "cmd": cmd,
         }
-        playbook_state.add_step(step)
-        return f"Added sleep step to the playbook:\n{yaml.dump(step, sort_keys=False)}"
-
-    # For non-sleep steps (browser actions)
-    if cmd is None:
-        raise ValueError("The 'cmd' parameter must be provided for a browser step.")
-
-    step = {
-        "type": step_type,
-        "cmd": cmd,
-    }
-    if url is not None:
-        step["url"] = url
-    if selector is not None:
-        step["selector"] = selector
-    if text is not None:
-        step["text"] = text
-    if session is not None:
-        step["session"] = session
-    if creates_session is not None:
-        step["creates_session"] = creates_session
-
-    playbook_state.add_step(step)
-    do_browser_action(step)
-    return f"Added step to the playbook:\n{yaml.dump(step, sort_keys=False)}"
-
-
-def do_browser_action(step_dict):
-    """
-    Actually perform the step using Playwright so we keep a real DOM in sync for subsequent calls.
-    """
-    if step_dict.get("type") != "browser":
-        return
+        if url is not None:
+            step["url"] = url
+        if selector is not None:
+            step["selector"] = selector
+        if text is not None:
+            step["text"] = text
+        if session is not None:
+            step["session"] = session
+        if creates_session is not None:
+            step["creates_session"] = creates_session
+
+        if creates_session is None and session not in self.browser_sessions:
+            # the step could not be executed, so the playbook would diverge from the live DOM
+            raise ValueError(self.missing_session_message(session))
+
+        self.playbook_state.add_step(step)
+        await self.do_browser_action(step)
+        return f"Added step to the playbook:\n{yaml.dump(step, sort_keys=False)}"
+
+    def missing_session_message(self, session: Optional[str]) -> str:
+        if session in self.browser_sessions.evicted:
+            return (f"Session '{session}' was closed because at most {self.browser_sessions.max_sessions} "
+                    f"sessions can be open. Create it again with a 'visit' step with creates_session.")
+        return "No active session. Create one with 'visit' command first."
 
-    cmd = step_dict.get("cmd")
-    session = step_dict.get("session")
-    creates_session = step_dict.get("creates_session")
+    async def do_browser_action(self, step_dict):
+        """
+        Actually perform the step using Playwright so we keep a real DOM in sync for subsequent calls.
+        """
+        if step_dict.get("type") != "browser":
+            return
+
+        cmd = step_dict.get("cmd")
+        session = step_dict.get("session")
+        creates_session = step_dict.get("creates_session")
+
+        # Start or retrieve the session
+        if creates_session:
+            # if it 'creates_session', we start a new browser context in the shared browser here
+            await self.browser_sessions.new_session(creates_session)
+            self.snapshot_trackers[creates_session] = SnapshotTracker()
+            # drop the snapshots of sessions closed to stay within the session limit
+            for name in [name for name in self.snapshot_trackers if name not in self.browser_sessions]:
+                del self.snapshot_trackers[name]
+            session = creates_session
+
+        if not session or session not in self.browser_sessions:
+            return
+
+        page = self.browser_sessions.get_page(session)
+        if not page:
+            return
+
+        with tracer.span(cmd or "unknown", "browser", session=session):
+            if cmd == "visit":
+                url = step_dict["url"]
+                await self.browser_sessions.navigate(session, url)
+
+            elif cmd == "click":
+                selector = step_dict.get("selector")
+                if selector:
+                    await page.click(selector)
+
+            elif cmd == "type":
+                selector = step_dict.get("selector")
+                text = step_dict.get("text", "")
+                if selector:
+                    await page.fill(selector, text)
+
+            else:
+                print("Unknown command:", cmd)
 
-    # Start or retrieve the session
-    if creates_session:
-        # if it 'creates_session', we start a new browser context here
-        playwright = sync_playwright().start()
-        browser = playwright.chromium.launch(headless=True)
-        page = browser.new_page()
-        browser_sessions[creates_session] = page
-        session = creates_session
 
-    if not session or session not in browser_sessions:
-        return
+# -------------------------------------------------------------------------------------
+# Chat Orchestration
+# -------------------------------------------------------------------------------------
 
-    page = browser_sessions.get(session)
-    if not page:
-        return
+async def execute_tool_call(tool_call, registry: ToolRegistry):
+    """Given a tool call from the model, run the corresponding Python function with provided arguments."""
+    return await run_tool(tool_call.function.name, tool_call.function.arguments, registry)
 
-    if cmd == "visit":
-        url = step_dict["url"]
-        page.goto(url)
 
-    elif cmd == "click":
-        selector = step_dict.get("selector")
-        if selector:
-            page.click(selector)
+async def run_tool(name: str, arguments: str, registry: ToolRegistry):
+    """
+    Validate the JSON `arguments` of a call to tool `name` and run the corresponding Python function.
+    Invalid calls are rejected without running the tool, and the error is returned to the model.
+    """
+    try:
+        args = registry.validate(name, arguments)
+    except ToolArgumentError as e:
+        print(f"Rejected tool call {name}: {e}")
+        return f"Error: {e}"
+    print(f"Assistant invoked tool: {name}({args})")
+    with tracer.span(name, "tool", arguments=args):
+        try:
+            return await registry.call(name, args)
+        except ValueError as e:
+            # the tools raise ValueError for argument combinations the schema cannot express
+            print(f"Rejected tool call {name}: {e}")
+            return f"Error: {e}"
 
-    elif cmd == "type":
-        selector = step_dict.get("selector")
-        text = step_dict.get("text", "")
-        if selector:
-            page.fill(selector, text)
 
-    else:
-        print("Unknown command:", cmd)
+def _arguments_complete(arguments: str) -> bool:
+    """Whether the streamed arguments of a tool call already form a complete JSON object."""
+    if not arguments.rstrip().endswith("}"):
+        return False
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except ValueError:
+        return False
 
 
-# -------------------------------------------------------------------------------------
-# Chat Orchestration
-# -------------------------------------------------------------------------------------
+async def stream_completion(request_messages: list, tool_schemas: list, registry: ToolRegistry):
+    """
+    Request a completion as a stream. Assistant text is printed as it arrives, and each tool call
+    is dispatched as soon as its arguments are complete JSON, while the rest of the response is
+    still streaming. The tool calls still run one after another, in the order the model made them.
+    Returns the assembled ChatCompletion and the results of its tool calls.
+    """
+    queue = asyncio.Queue()
+    results = []
 
-# Our tools for the agent to call:
-tools = [get_interactive_elements, add_playbook_step]
+    async def run_tools():
+        while (call := await queue.get()) is not None:
+            results.append(await run_tool(call["function"]["name"], call["function"]["arguments"], registry))
 
-def execute_tool_call(tool_call, tools_map):
-    """Given a tool call from the model, run the corresponding Python function with provided arguments."""
-    name = tool_call.function.name
-    args = json.loads(tool_call.function.arguments)
-    print(f"Assistant invoked tool: {name}({args})")
-    return tools_map[name](**args)
+    worker = asyncio.create_task(run_tools())
+    start = time.perf_counter()
+    content_parts = []
+    calls = []
+    dispatched = 0
+    completion = {"id": "", "created": 0, "model": MODEL, "finish_reason": "stop", "usage": None}
 
+    def dispatch(call):
+        if dispatched == 0:
+            print(f"\nTime to first action: {(time.perf_counter() - start) * 1000:.0f} ms")
+        queue.put_nowait(call)
 
-def run_full_turn(system_message, tools, messages):
+    try:
+        stream = await get_client().chat.completions.create(
+            model=MODEL,
+            messages=request_messages,
+            tools=tool_schemas,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in stream:
+            completion.update(id=chunk.id, created=chunk.created, model=chunk.model)
+            if chunk.usage is not None:
+                completion["usage"] = chunk.usage.model_dump()
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                completion["finish_reason"] = choice.finish_reason
+
+            if choice.delta.content:
+                if not content_parts:
+                    print("Assistant: ", end="")
+                print(choice.delta.content, end="", flush=True)
+                content_parts.append(choice.delta.content)
+
+            for part in choice.delta.tool_calls or []:
+                while len(calls) <= part.index:
+                    calls.append({"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+                call = calls[part.index]
+                if part.id:
+                    call["id"] = part.id
+                if part.function is not None:
+                    call["function"]["name"] += part.function.name or ""
+                    call["function"]["arguments"] += part.function.arguments or ""
+
+            # a call is complete once its arguments parse or the model has moved on to the next call
+            while dispatched < len(calls) and (
+                    dispatched < len(calls) - 1 or _arguments_complete(calls[dispatched]["function"]["arguments"])
+            ):
+                dispatch(calls[dispatched])
+                dispatched += 1
+
+        for call in calls[dispatched:]:
+            dispatch(call)
+            dispatched += 1
+        queue.put_nowait(None)
+        await worker
+    finally:
+        worker.cancel()
+
+    if content_parts:
+        print()
+    message = {"role": "assistant", "content": "".join(content_parts) or None}
+    if calls:
+        message["tool_calls"] = calls
+    response = ChatCompletion.model_validate({
+        "id": completion["id"],
+        "object": "chat.completion",
+        "created": completion["created"],
+        "model": completion["model"],
+        "choices": [{"index": 0, "finish_reason": completion["finish_reason"], "message": message}],
+        "usage": completion["usage"],
+    })
+    return response, results
+
+
+def record_usage(usage: dict, response, cached: bool = False) -> None:
+    """
+    Add the completion count and token usage of `response` to the `usage` totals.
+    Completions served from the cache are counted separately and cost no tokens.
+    """
+    usage["completions"] = usage.get("completions", 0) + 1
+    if cached:
+        usage["cached_completions"] = usage.get("cached_completions", 0) + 1
+    elif response.usage is not None:
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + response.usage.prompt_tokens
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + response.usage.completion_tokens
+
+
+async def run_full_turn(
+        system_message,
+        tools,
+        messages,
+        usage: Optional[dict] = None,
+        cache: Optional[CompletionCache] = None,
+        compactor: Optional[ContextCompactor] = None,
+        stream: bool = False
+):
     """
     The main conversation loop. The agent can generate JSON tool calls, which we then execute.
     After any tool calls, we feed back the results as 'tool' messages. The loop continues
     until the assistant returns a final message with no more tool calls.
+    If a `usage` dict is given, the number of completions and their token usage are added to it.
+    If a `cache` is given, identical completion requests are answered from disk.
+    If a `compactor` is given, older element snapshots are summarized in the requests to bound their size.
+    With `stream`, text is printed as it arrives and tool calls run while the response is still streaming.
     """
     num_init_messages = len(messages)
     messages = messages.copy()
     yml_msg = None  # This will hold the YAML message from the assistant
 
+    # Python functions are converted into JSON schemas once, when they are registered
+    registry = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
+    tool_schemas = registry.schemas
+
+    turn_number = 0
     while True:
-        # Convert python functions into JSON schemas
-        tool_schemas = [function_to_schema(tool) for tool in tools]
-        tools_map = {tool.__name__: tool for tool in tools}
-
-        # === 1. Get openai completion ===
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[{"role": "system", "content": system_message}] + messages,
-            tools=tool_schemas,
-        )
+        turn_number += 1
+        with tracer.turn(number=turn_number) as turn:
+            # === 1. Get openai completion ===
+            request_messages = [{"role": "system", "content": system_message}] + messages
+            if compactor is not None:
+                request_messages = compactor.compact(request_messages)
+                print(compactor.report())
+            response = None
+            tool_results = None  # results of tool calls that already ran while streaming
+            if cache is not None:
+                cache_key = cache.key(MODEL, request_messages, tool_schemas)
+                response = cache.get(cache_key)
+            cached = response is not None
+            with tracer.span("completion", "llm", model=MODEL, cached=cached, stream=stream) as span:
+                if not cached and stream:
+                    response, tool_results = await stream_completion(request_messages, tool_schemas, registry)
+                    if cache is not None:
+                        cache.put(cache_key, response)
+                elif not cached:
+                    response = await get_client().chat.completions.create(
+                        model=MODEL,
+                        messages=request_messages,
+                        tools=tool_schemas,
+                    )
+                    if cache is not None:
+                        cache.put(cache_key, response)
+                if span is not None and response.usage is not None and not cached:
+                    tokens = {
+                        "prompt_tokens": response.usage.prompt_tokens,
+                        "completion_tokens": response.usage.completion_tokens,
+                    }
+                    span.args.update(tokens)
+                    turn.args.update(tokens)
+
+            if usage is not None:
+                record_usage(usage, response, cached=cached)
+
+            message = response.choices[0].message
+            messages.append(message)
+
+            if message.content:  # The "assistant" response to print for the user
+                yml_msg = message.content
+                if tool_results is None:  # streamed text was already printed
+                    print("Assistant:", yml_msg)
+
+            if not message.tool_calls:
+                # If there are no tool calls, we assume the conversation step is over
+                break
 
-        message = response.choices[0].message
-        messages.append(message)
-
-        if message.content:  # The "assistant" response to print for the user
-            yml_msg = message.content
-            print("Assistant:", yml_msg)
-
-        if not message.tool_calls:
-            # If there are no tool calls, we assume the conversation step is over
-            break
-
-        # === 2. handle tool calls ===
-        for tool_call in message.tool_calls:
-            result = execute_tool_call(tool_call, tools_map)
-            # Return the result to the conversation
-            result_message = {
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": result,
-            }
-            messages.append(result_message)
+            # === 2. handle tool calls ===
+            if tool_results is None:
+                tool_results = [await execute_tool_call(tool_call, registry) for tool_call in message.tool_calls]
+            for tool_call, result in zip(message.tool_calls, tool_results):
+                # Return the result to the conversation
+                result_message = {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": result,
+                }
+                messages.append(result_message)
 
     return messages[num_init_messages:], yml_msg
 
 
-def main(output_file: Optional[str] = None):
+def build_system_message(goal: str, doc_index: Optional[DocIndex] = None, top_k: int = 5) -> str:
+    """
+    The system message, followed by the `top_k` sections of the AttackMate docs that are most
+    relevant to the user's goal, instead of the whole documentation.
+    """
+    if doc_index is None or top_k <= 0:
+        return SYSTEM_MESSAGE
+    sections = [text for _, text in doc_index.search(goal, top_k)]
+    if not sections:
+        return SYSTEM_MESSAGE
+    docs = "\n\n".join(sections)
+    print(f"Added {len(sections)} documentation sections ({count_tokens(docs)} tokens) to the system message")
+    return f"{SYSTEM_MESSAGE}\nRelevant AttackMate documentation:\n\n{docs}\n"
+
+
+def main(
+        output_file: Optional[str] = None,
+        snapshot_format: str = "compact",
+        token_budget: Optional[int] = None,
+        max_sessions: int = 4,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: float = 256,
+        cache_max_age_days: float = 30,
+        keep_snapshots: int = 3,
+        context_ceiling: Optional[int] = None,
+        stream: bool = False,
+        trace_file: Optional[str] = None,
+        docs_top_k: int = 0,
+        docs_index: Optional[str] = None,
+        navigation_wait: str = "load",
+        block_resources: tuple = (),
+        session_navigation_specs: Optional[list] = None
+):
+    tracer.enabled = trace_file is not None
+    doc_index = load_or_build(docs_index) if docs_top_k > 0 else None
+    cache = CompletionCache(cache_dir, cache_max_mb, cache_max_age_days) if cache_dir else None
+    compactor = ContextCompactor(keep_snapshots, context_ceiling)
+    browser_pool = BrowserPool()
+    generation = Generation(
+        browser_pool,
+        snapshot_formatter=SnapshotFormatter(snapshot_format, token_budget),
+        max_sessions=max_sessions,
+        navigation=NavigationPolicy.from_spec(navigation_wait, block_resources),
+        session_navigation=session_navigation(session_navigation_specs, block_resources),
+    )
     messages = []
-    while True:
-        try:
-            user_input = input("User: ")
-            if not user_input.strip():
-                print("Exiting...")
+    yml_msg = None
+    # one event loop for the whole CLI session, as the async browser sessions are bound to it
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                user_input = input("User: ")
+                if not user_input.strip():
+                    print("Exiting...")
+                    break
+                messages.append({"role": "user", "content": user_input})
+                system_message = build_system_message(user_input, doc_index, docs_top_k)
+                new_messages, yml_msg = loop.run_until_complete(
+                    run_full_turn(system_message, generation.tools, messages, cache=cache, compactor=compactor, stream=stream)
+                )
+                messages.extend(new_messages)
+            except KeyboardInterrupt:
+                print("\nExiting...")
                 break
-            messages.append({"role": "user", "content": user_input})
-            new_messages, yml_msg = run_full_turn(SYSTEM_MESSAGE, tools, messages)
-            messages.extend(new_messages)
-        except KeyboardInterrupt:
-            print("\nExiting...")
-            break
-        finally:
-            print("Current Attackmate Playbook:\n", playbook_state.to_yaml())
+            finally:
+                print("Current Attackmate Playbook:\n", generation.playbook_state.to_yaml())
+    finally:
+        # close all browser sessions and the shared browser
+        loop.run_until_complete(generation.close())
+        loop.run_until_complete(browser_pool.close())
+        loop.close()
+        if cache is not None:
+            print(cache.report())
+        if trace_file:
+            tracer.export_chrome_trace(trace_file)
+            print(f"Trace written to {trace_file}")
 
     # After exiting the loop, optionally write the playbook to file
     if output_file:
         yaml_text = extract_yaml_from_messages(yml_msg)
         if yaml_text is None:
-            yaml_text = playbook_state.to_yaml()
+            yaml_text = generation.playbook_state.to_yaml()
         write_playbook_to_file(yaml_text, output_file)
         print(f"Playbook written to {output_file}")
 
@@ -277,5 +584,115 @@ if __name__ == "__main__":
         default=None,
         help="Optional path to write the generated playbook YAML",
     )
+    parser.add_argument(
+        "--snapshot-format",
+        choices=SNAPSHOT_FORMATS,
+        default="compact",
+        help="Encoding of the interactive element snapshots sent to the model",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Optional maximum number of tokens per element snapshot; longer snapshots are cut off",
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=4,
+        help="Maximum number of open browser sessions; the least recently used one is closed beyond that",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="Optional directory for caching completions; identical requests are answered from disk",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=256,
+        help="Maximum size of the completion cache; least recently used entries are evicted beyond that",
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=30,
+        help="Cached completions older than this are discarded",
+    )
+    parser.add_argument(
+        "--keep-snapshots",
+        type=int,
+        default=3,
+        help="Number of most recent element snapshots sent verbatim; older ones are summarized",
+    )
+    parser.add_argument(
+        "--context-ceiling",
+        type=int,
+        default=None,
+        help="Optional token ceiling per request; recent snapshots are summarized too while above it",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream completions: print text as it arrives and run tool calls before the response is complete",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Optional path of a Chrome trace / Perfetto JSON file with the timing of completions, tools and browser actions",
+    )
+    parser.add_argument(
+        "--docs-top-k",
+        type=int,
+        default=0,
+        help="Add the K sections of the AttackMate docs most relevant to each user message to the system message",
+    )
+    parser.add_argument(
+        "--docs-index",
+        type=str,
+        default=None,
+        help="BM25 index of the docs; built from src/txt-docs if missing (default: src/txt-docs/docs.bm25)",
+    )
+    parser.add_argument(
+        "--navigation-wait",
+        type=navigation_spec,
+        default="load",
+        help="What navigations wait for: load, domcontentloaded, networkidle, networkidle:MS (capped at MS "
+             "milliseconds, default 5000) or selector:CSS",
+    )
+    parser.add_argument(
+        "--session-navigation",
+        type=session_navigation_spec,
+        action="append",
+        default=[],
+        metavar="SESSION=WAIT",
+        help="Navigation wait of one browser session, e.g. zm=selector:#monitors; can be given several times",
+    )
+    parser.add_argument(
+        "--block-resources",
+        nargs="*",
+        choices=BLOCKABLE_RESOURCE_TYPES,
+        default=[],
+        help="Resource types the browser sessions do not load, e.g. image media font",
+    )
     args = parser.parse_args()
-    main(output_file=args.output)
+    main(
+        output_file=args.output,
+        snapshot_format=args.snapshot_format,
+        token_budget=args.token_budget,
+        max_sessions=args.max_sessions,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        cache_max_age_days=args.cache_max_age_days,
+        keep_snapshots=args.keep_snapshots,
+        context_ceiling=args.context_ceiling,
+        stream=args.stream,
+        trace_file=args.trace,
+        docs_top_k=args.docs_top_k,
+        docs_index=args.docs_index,
+        navigation_wait=args.navigation_wait,
+        block_resources=tuple(args.block_resources),
+        session_navigation_specs=args.session_navigation,
+    )
@@ -0,0 +1,200 @@
+"""
+Fast local replay of generated playbooks.
+
+The `browser` steps of each playbook are executed against Playwright with the same logic the
+generator uses (`Generation.do_browser_action`), while `sleep` steps run on virtual time: they
+are skipped by default or scaled with --sleep-scale. Many playbooks are replayed in parallel in
+one shared browser, and the success and latency of every step is reported.
+
+Run with:
+python replay.py ../../playbooks/llm --workers 8 --report replay.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from string import Template
+from typing import Optional
+import yaml
+from playbookgen.batch import collect_files
+from playbookgen.main import Generation, BROWSER_COMMANDS
+from playbookgen.utils.browser_pool import (
+    BrowserPool, NavigationPolicy, BLOCKABLE_RESOURCE_TYPES, session_navigation,
+    navigation_spec, session_navigation_spec
+)
+
+
+def load_playbook(path: str) -> list:
+    """Read the commands of a playbook, with its `vars` substituted ($NAME and ${NAME})."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+    variables = {str(key): str(value) for key, value in (content.get("vars") or {}).items()}
+
+    def substitute(value):
+        if isinstance(value, str):
+            return Template(value).safe_substitute(variables)
+        return value
+
+    return [
+        {key: substitute(value) for key, value in command.items()}
+        for command in content.get("commands") or []
+    ]
+
+
+async def replay_step(generation: Generation, step: dict, sleep_scale: float) -> dict:
+    """Execute one step and return its result row."""
+    step_type = step.get("type")
+    result = {"type": step_type, "cmd": step.get("cmd"), "status": "ok", "latency_ms": 0.0, "error": None}
+
+    if step_type == "sleep":
+        seconds = float(step.get("seconds", 0))
+        result["virtual_s"] = seconds
+        if sleep_scale > 0:
+            await asyncio.sleep(seconds * sleep_scale)
+        return result
+
+    if step_type != "browser" or step.get("cmd") not in BROWSER_COMMANDS:
+        # e.g. debug steps or screenshots, which do not change the page
+        result["status"] = "skipped"
+        return result
+
+    session = step.get("creates_session") or step.get("session")
+    if not step.get("creates_session") and session not in generation.browser_sessions:
+        result["status"] = "failed"
+        result["error"] = f"Unknown session '{session}'"
+        return result
+
+    if step.get("cmd") in ("click", "type") and not step.get("selector"):
+        # do_browser_action does nothing without a selector, which AttackMate would reject
+        result["status"] = "failed"
+        result["error"] = f"'{step.get('cmd')}' step without a selector"
+        return result
+
+    start = time.perf_counter()
+    try:
+        await generation.do_browser_action(step)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+async def replay_playbook(
+        path: str,
+        browser_pool: BrowserPool,
+        semaphore: asyncio.Semaphore,
+        sleep_scale: float = 0.0,
+        step_timeout: Optional[float] = 5000,
+        keep_going: bool = False,
+        navigation: Optional[NavigationPolicy] = None,
+        session_policies: Optional[dict] = None
+) -> dict:
+    """Replay one playbook and return its report. Stops at the first failed step unless `keep_going`."""
+    report = {"playbook": path, "ok": True, "steps": [], "error": None}
+    try:
+        steps = load_playbook(path)
+    except (OSError, yaml.YAMLError, AttributeError) as e:
+        report.update(ok=False, error=f"Could not load playbook: {e}", wall_time_s=0.0, virtual_time_s=0.0)
+        return report
+    if not steps:
+        # e.g. a file with only comments, which must not pass as a working playbook
+        report.update(ok=False, error="Playbook has no commands", wall_time_s=0.0, virtual_time_s=0.0)
+        return report
+
+    async with semaphore:
+        generation = Generation(browser_pool, elements_file=None, action_timeout=step_timeout,
+                                navigation=navigation, session_navigation=session_policies)
+        start = time.perf_counter()
+        try:
+            for number, step in enumerate(steps, start=1):
+                result = await replay_step(generation, step, sleep_scale)
+                result["step"] = number
+                report["steps"].append(result)
+                if result["status"] == "failed":
+                    report["ok"] = False
+                    if not keep_going:
+                        break
+        finally:
+            await generation.close()
+        report["wall_time_s"] = round(time.perf_counter() - start, 3)
+
+    report["virtual_time_s"] = sum(step.get("virtual_s", 0.0) for step in report["steps"])
+    report["not_run"] = len(steps) - len(report["steps"])
+    return report
+
+
+async def replay_all(paths: list, workers: int = 8, **options) -> list:
+    """Replay all playbooks, at most `workers` at a time, in one shared browser."""
+    browser_pool = BrowserPool()
+    semaphore = asyncio.Semaphore(workers)
+    try:
+        return await asyncio.gather(*(replay_playbook(path, browser_pool, semaphore, **options) for path in paths))
+    finally:
+        await browser_pool.close()
+
+
+def print_report(reports: list, wall_time: float) -> None:
+    for report in reports:
+        status = "OK" if report["ok"] else "FAILED"
+        browser_steps = [step for step in report["steps"] if step["latency_ms"]]
+        mean_ms = sum(step["latency_ms"] for step in browser_steps) / len(browser_steps) if browser_steps else 0.0
+        print(f"{status:<7} {os.path.basename(report['playbook']):<30} {len(report['steps']):>4} steps "
+              f"in {report['wall_time_s']:6.2f} s (mean browser step {mean_ms:7.1f} ms, "
+              f"{report['virtual_time_s']:.0f} s of sleeps skipped)")
+        if report["error"]:
+            print(f"    {report['error']}")
+        for step in report["steps"]:
+            if step["status"] == "failed":
+                print(f"    step {step['step']} ({step['cmd']}): {step['error']}")
+        if report.get("not_run"):
+            print(f"    {report['not_run']} steps not run")
+    passed = sum(report["ok"] for report in reports)
+    print(f"{passed}/{len(reports)} playbooks passed in {wall_time:.2f} s")
+
+
+def main(sources: list, workers: int, sleep_scale: float, step_timeout: float,
+         keep_going: bool, report_file: Optional[str], navigation_wait: str = "load",
+         block_resources: tuple = (), session_navigation_specs: Optional[list] = None) -> bool:
+    paths = collect_files(sources, pattern="*.yml")
+    if not paths:
+        print("No playbooks found.")
+        return False
+
+    start = time.perf_counter()
+    reports = asyncio.run(replay_all(
+        paths, workers, sleep_scale=sleep_scale, step_timeout=step_timeout, keep_going=keep_going,
+        navigation=NavigationPolicy.from_spec(navigation_wait, block_resources),
+        session_policies=session_navigation(session_navigation_specs, block_resources),
+    ))
+    wall_time = time.perf_counter() - start
+    print_report(reports, wall_time)
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump({"wall_time_s": round(wall_time, 3), "playbooks": reports}, f, indent=2)
+        print(f"Report written to {report_file}")
+    return all(report["ok"] for report in reports)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay playbooks locally to validate them")
+    parser.add_argument("playbooks", nargs="+", help="Playbook files, directories of *.yml playbooks or glob patterns")
+    parser.add_argument("--workers", "-j", type=int, default=8, help="Number of playbooks replayed concurrently")
+    parser.add_argument("--sleep-scale", type=float, default=0.0,
+                        help="Factor applied to sleep steps; 0 (default) skips them")
+    parser.add_argument("--step-timeout", type=float, default=5000,
+                        help="Timeout in milliseconds for each navigation and action")
+    parser.add_argument("--keep-going", action="store_true", help="Continue a playbook after a failed step")
+    parser.add_argument("--report", type=str, default=None, help="Optional path to write the JSON report")
+    parser.add_argument("--navigation-wait", type=navigation_spec, default="load",
+                        help="What navigations wait for: load, domcontentloaded, networkidle, networkidle:MS or selector:CSS")
+    parser.add_argument("--session-navigation", type=session_navigation_spec, action="append", default=[],
+                        metavar="SESSION=WAIT",
+                        help="Navigation wait of one browser session; can be given several times")
+    parser.add_argument("--block-resources", nargs="*", choices=BLOCKABLE_RESOURCE_TYPES, default=[],
+                        help="Resource types the browser sessions do not load")
+    args = parser.parse_args()
+    ok = main(args.playbooks, args.workers, args.sleep_scale, args.step_timeout, args.keep_going, args.report,
+              args.navigation_wait, tuple(args.block_resources), args.session_navigation)
+    raise SystemExit(0 if ok else 1)
@@ -1,92 +1,263 @@
 import json
+from typing import Optional, Sequence
 from playwright.sync_api import Page, ElementHandle
 
 
+# Tags we consider interactive when taking a snapshot of the page.
+INTERACTIVE_SELECTOR = "a, button, input, textarea, select"
+
+# In-page implementation of the naive selector, used by `build_naive_css_selector` and to compare
+# the selector engine below with it.
+NAIVE_SELECTOR_JS = """
+function getSelector(node) {
+    // If the node is the document or the HTML element, stop.
+    if (!node || node.nodeType !== Node.ELEMENT_NODE) return '';
+    let selector = node.tagName.toLowerCase();
+
+    // If it has an ID, use that and stop climbing.
+    if (node.id) {
+        selector += '#' + node.id;
+        return selector;
+    }
+
+    // Otherwise, if it has a class, include the first class as a partial reference.
+    // (SVG elements expose className as an object, so only plain strings are used.)
+    if (typeof node.className === 'string' && node.className) {
+        const className = node.className.trim().split(' ')[0];
+        if (className) {
+            selector += '.' + className;
+        }
+    }
+
+    const parent = node.parentElement;
+    if (!parent) {
+        return selector;
+    }
+
+    // Count how many siblings of the same type precede the node.
+    let index = 1;
+    let sibling = node.previousElementSibling;
+    while (sibling) {
+        if (sibling.tagName === node.tagName) {
+            index += 1;
+        }
+        sibling = sibling.previousElementSibling;
+    }
+
+    // Append :nth-of-type if needed.
+    selector += ':nth-of-type(' + index + ')';
+
+    // Recursively go up the tree.
+    return getSelector(parent) + ' > ' + selector;
+}
+"""
+
+# In-page selector engine. Computes the shortest selector that matches exactly one element,
+# preferring id, then name, then aria-label, then other short attributes, a class, and pairs of
+# attributes, as the system message asks the model to do. Attribute value counts are computed
+# once per snapshot, so uniqueness checks are map lookups instead of a DOM query per candidate.
+# Elements without a unique attribute get a :nth-of-type chain from the closest ancestor with a
+# unique id (or from body), which is unique by construction.
+SELECTOR_ENGINE_JS = r"""
+function createSelectorEngine() {
+    const IDENT = /^[A-Za-z_][A-Za-z0-9_-]*$/;
+    const ATTRIBUTES = ['name', 'aria-label', 'placeholder', 'type', 'value', 'title', 'role', 'href'];
+    const SEP = '\u0000';
+    const counts = {};
+    let classCounts = null;
+
+    const quote = (value) => "'" + value.replace(/\\/g, '\\\\').replace(/'/g, "\\'") + "'";
+    const usable = (value) => !!value && value.length <= 80 && !/[\n\r]/.test(value);
+
+    function countsFor(attr) {
+        if (!counts[attr]) {
+            const map = new Map();
+            document.querySelectorAll('[' + attr + ']').forEach((node) => {
+                const value = node.getAttribute(attr);
+                const key = attr === 'id' ? value : node.localName + SEP + value;
+                map.set(key, (map.get(key) || 0) + 1);
+            });
+            counts[attr] = map;
+        }
+        return counts[attr];
+    }
+
+    function classCount(tag, cls) {
+        if (!classCounts) {
+            classCounts = new Map();
+            document.querySelectorAll('[class]').forEach((node) => {
+                new Set(node.classList).forEach((name) => {
+                    const key = node.localName + SEP + name;
+                    classCounts.set(key, (classCounts.get(key) || 0) + 1);
+                });
+            });
+        }
+        return classCounts.get(tag + SEP + cls) || 0;
+    }
+
+    function isUnique(selector) {
+        try {
+            return document.querySelectorAll(selector).length === 1;
+        } catch (e) {
+            return false;
+        }
+    }
+
+    function idSelector(node) {
+        const id = node.getAttribute('id');
+        if (!usable(id) || countsFor('id').get(id) !== 1) return null;
+        return IDENT.test(id) ? '#' + id : node.localName + '[id=' + quote(id) + ']';
+    }
+
+    function pathSelector(el) {
+        const parts = [];
+        let node = el;
+        while (node && node !== document.body && node !== document.documentElement) {
+            const anchor = node !== el ? idSelector(node) : null;
+            if (anchor) {
+                parts.unshift(anchor);
+                return parts.join(' > ');
+            }
+            let index = 1;
+            let sibling = node.previousElementSibling;
+            while (sibling) {
+                if (sibling.localName === node.localName) index += 1;
+                sibling = sibling.previousElementSibling;
+            }
+            parts.unshift(node.localName + ':nth-of-type(' + index + ')');
+            node = node.parentElement;
+        }
+        parts.unshift(node ? node.localName : 'html');
+        return parts.join(' > ');
+    }
+
+    function selectorFor(el) {
+        const tag = el.localName;
+        const byId = idSelector(el);
+        if (byId) return byId;
+
+        const singles = [];
+        for (const attr of ATTRIBUTES) {
+            const value = el.getAttribute(attr);
+            if (!usable(value)) continue;
+            const selector = tag + '[' + attr + '=' + quote(value) + ']';
+            if (countsFor(attr).get(tag + SEP + value) === 1) return selector;
+            singles.push(selector.slice(tag.length));
+        }
+        for (const cls of el.classList) {
+            if (IDENT.test(cls) && classCount(tag, cls) === 1) return tag + '.' + cls;
+        }
+        for (let i = 0; i < singles.length; i++) {
+            for (let j = i + 1; j < singles.length; j++) {
+                const selector = tag + singles[i] + singles[j];
+                if (isUnique(selector)) return selector;
+            }
+        }
+        return pathSelector(el);
+    }
+
+    return {selectorFor};
+}
+"""
+
+# Describes a single element with every field we collect for snapshots.
+ELEMENT_RECORD_JS = """
+function describeElement(el, index, selectors) {
+    const rect = el.getBoundingClientRect();
+    return {
+        index: index,
+        tag: el.tagName,
+        id: el.getAttribute('id'),
+        class: el.getAttribute('class'),
+        type: el.getAttribute('type'),
+        role: el.getAttribute('role'),
+        text: (el.innerText || '').trim(),
+        placeholder: el.getAttribute('placeholder'),
+        selector: 'css=' + selectors.selectorFor(el),
+        // Playwright reports no bounding box for elements that are not rendered.
+        bounding_box: (rect.width || rect.height)
+            ? {x: rect.x, y: rect.y, width: rect.width, height: rect.height}
+            : null,
+    };
+}
+"""
+
+# Collects every field of every interactive element in one evaluation, so a snapshot costs a
+# single Playwright round-trip regardless of how many elements are on the page.
+EXTRACT_ELEMENTS_JS = """
+(query) => {
+    %s
+    %s
+    const selectors = createSelectorEngine();
+    const results = [];
+    document.querySelectorAll(query).forEach((el, i) => results.push(describeElement(el, i + 1, selectors)));
+    return results;
+}
+""" % (SELECTOR_ENGINE_JS, ELEMENT_RECORD_JS)
+
+# Computes both the engine's and the naive selector of every interactive element and how many
+# elements each of them matches.
+COMPARE_SELECTORS_JS = """
+(query) => {
+    %s
+    %s
+    const count = (selector) => {
+        try {
+            return document.querySelectorAll(selector).length;
+        } catch (e) {
+            return 0;
+        }
+    };
+    const selectors = createSelectorEngine();
+    return Array.from(document.querySelectorAll(query), (el) => {
+        const unique = selectors.selectorFor(el);
+        const naive = getSelector(el);
+        return {unique, naive, unique_matches: count(unique), naive_matches: count(naive)};
+    });
+}
+""" % (SELECTOR_ENGINE_JS, NAIVE_SELECTOR_JS)
+
+
 def build_naive_css_selector(element: ElementHandle) -> str:
     """
     naive CSS selector builder by climbing up DOM parents
     """
-    return element.evaluate(
-        """
-        (el) => {
-            function getSelector(node) {
-                // If the node is the document or the HTML element, stop.
-                if (!node || node.nodeType !== Node.ELEMENT_NODE) return '';
-                let selector = node.tagName.toLowerCase();
-
-                // If it has an ID, use that and stop climbing.
-                if (node.id) {
-                    selector += '#' + node.id;
-                    return selector;
-                }
-
-                // Otherwise, if it has a class, include the first class as a partial reference.
-                if (node.className) {
-                    const className = node.className.trim().split(' ')[0];
-                    if (className) {
-                        selector += '.' + className;
-                    }
-                }
-
-                const parent = node.parentElement;
-                if (!parent) {
-                    return selector;
-                }
-
-                // Count how many siblings of the same type precede the node.
-                let index = 1;
-                let sibling = node.previousElementSibling;
-                while (sibling) {
-                    if (sibling.tagName === node.tagName) {
-                        index += 1;
-                    }
-                    sibling = sibling.previousElementSibling;
-                }
-
-                // Append :nth-of-type if needed.
-                selector += ':nth-of-type(' + index + ')';
-
-                // Recursively go up the tree.
-                return getSelector(parent) + ' > ' + selector;
-            }
+    return element.evaluate("(el) => { %s\n return getSelector(el); }" % NAIVE_SELECTOR_JS)
 
-            return getSelector(el);
-        }
-        """
-    )
 
+def extract_interactive_elements(page: Page, fields: Optional[Sequence[str]] = None) -> list:
+    """
+    Collect all interactive elements of the page, with their fields and selectors, in a single
+    in-page evaluation.
+
+    Parameters:
+        page (Page): Playwright page to snapshot.
+        fields (Sequence[str], optional): Keys to keep for each element, in the given order.
+            All collected fields are returned if omitted.
 
-def get_interactive_elements(session_id: str, output_file: str = "elements.json") -> str:
+    Returns:
+        list: One dict per element, in document order.
     """
-    Collect interactive elements from current page, save to JSON file, and return results.
-    Returns JSON string of elements or error message if session doesn't exist.
+    elements = page.evaluate(EXTRACT_ELEMENTS_JS, INTERACTIVE_SELECTOR)
+    if fields:
+        elements = [{key: elem[key] for key in fields} for elem in elements]
+    return elements
+
+
+def compare_selectors(page: Page) -> dict:
+    """
+    Compare the selectors of the selector engine with the naive builder for all interactive
+    elements of the page: their mean length and the share of selectors matching exactly one element.
     """
-    if session_id not in browser_sessions:
-        return "No active session. Create one with 'visit' command first."
-
-    page = browser_sessions[session_id]
-    try:
-        elements = page.query_selector_all("a, button, input, textarea, select")
-        interactive_elements = []
-
-        for idx, elem in enumerate(elements, start=1):
-            css_selector = build_naive_css_selector(elem)
-            interactive_elements.append({
-                "index": idx,
-                "selector": f"css={css_selector}",
-                "tag": elem.evaluate("el => el.tagName"),
-                "text": elem.inner_text().strip(),
-                "type": elem.get_attribute("type"),
-                "id": elem.get_attribute("id"),
-                "class": elem.get_attribute("class")
-            })
-
-        with open(output_file, "w") as f:
-            json.dump(interactive_elements, f, indent=2)
-
-        return json.dumps(interactive_elements, indent=2)
-    except Exception as e:
-        return f"Error collecting elements: {str(e)}"
+    rows = page.evaluate(COMPARE_SELECTORS_JS, INTERACTIVE_SELECTOR)
+    count = len(rows) or 1
+    return {
+        "elements": len(rows),
+        "unique_mean_length": sum(len(row["unique"]) for row in rows) / count,
+        "naive_mean_length": sum(len(row["naive"]) for row in rows) / count,
+        "unique_exact_share": sum(row["unique_matches"] == 1 for row in rows) / count,
+        "naive_exact_share": sum(row["naive_matches"] == 1 for row in rows) / count,
+    }
 
 
 def collect_and_save_interactive_elements(page: Page, output_file: str) -> None:
@@ -94,37 +265,9 @@ def collect_and_save_interactive_elements(page: Page, output_file: str) -> None:
     Collects potentially interactive elements from the given Playwright Page
     and saves the collected data as JSON to `output_file`.
     """
-    selectors = ["a", "button", "input", "textarea", "select"]
-    joined_selectors = ",".join(selectors)
-    elements = page.query_selector_all(joined_selectors)
-    interactive_elements = []
-
-    for idx, elem in enumerate(elements, start=1):
-        tag_name = elem.evaluate("el => el.tagName")
-        element_id = elem.get_attribute("id")
-        element_class = elem.get_attribute("class")
-        element_type = elem.get_attribute("type")
-        element_role = elem.get_attribute("role")
-        element_placeholder = elem.get_attribute("placeholder")
-        element_text = elem.inner_text().strip()
-        bounding_box = elem.bounding_box()  # may be None if off-screen
-
-        css_selector = build_naive_css_selector(elem)
-
-        record = {
-            "index": idx,
-            "tag": tag_name,
-            "id": element_id,
-            "class": element_class,
-            "type": element_type,
-            "role": element_role,
-            "text": element_text,
-            "placeholder": element_placeholder,
-            "selector": f"css={css_selector}",
-            "bounding_box": bounding_box
-        }
-
-        interactive_elements.append(record)
+    interactive_elements = extract_interactive_elements(page, fields=(
+        "index", "tag", "id", "class", "type", "role", "text", "placeholder", "selector", "bounding_box"
+    ))
 
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(interactive_elements, f, indent=2)
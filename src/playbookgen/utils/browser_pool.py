@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright, Route
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+
+# what a navigation waits for before the page counts as loaded
+NAVIGATION_WAITS = ("load", "domcontentloaded", "networkidle", "selector")
+# resource types that can be blocked; images, media and fonts do not change the interactive DOM,
+# while without stylesheets elements hidden by CSS count as visible
+BLOCKABLE_RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+
+
+class BrowserPool:
+    """
+    One long-lived Chromium shared by all browser sessions. Each session gets its own
+    lightweight BrowserContext (separate cookies and storage), which starts in milliseconds
+    instead of launching a new browser process.
+    """
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._launch_lock = asyncio.Lock()
+
+    async def _ensure_browser(self) -> Browser:
+        async with self._launch_lock:
+            if self._browser is None:
+                start = time.perf_counter()
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                print(f"Browser launched in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self._browser
+
+    async def new_context(self) -> BrowserContext:
+        """Open a new context in the shared browser, launching the browser on first use."""
+        browser = await self._ensure_browser()
+        return await browser.new_context()
+
+    async def close(self) -> None:
+        """Close the browser (and with it all contexts) and the Playwright driver."""
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class NavigationPolicy:
+    """
+    How a session navigates: `wait_until` is "load" (Playwright's default), "domcontentloaded",
+    "networkidle" (after the DOM content is loaded, waits at most `wait_cap` milliseconds for the
+    network to become idle) or "selector" (after the DOM content is loaded, waits at most
+    `wait_cap` milliseconds for `selector`). Requests of the `block_resources` types are aborted.
+    """
+    def __init__(self, wait_until: str = "load", wait_cap: float = 5000, selector: Optional[str] = None,
+                 block_resources: tuple = ()):
+        if wait_until not in NAVIGATION_WAITS:
+            raise ValueError(f"Unknown navigation wait '{wait_until}', expected one of {NAVIGATION_WAITS}")
+        if wait_until == "selector" and not selector:
+            raise ValueError("Navigation wait 'selector' needs a selector")
+        self.wait_until = wait_until
+        self.wait_cap = wait_cap
+        self.selector = selector
+        self.block_resources = tuple(block_resources)
+
+    @classmethod
+    def from_spec(cls, spec: str, block_resources: tuple = (), wait_cap: float = 5000) -> "NavigationPolicy":
+        """
+        Parse a policy from the command line: "load", "domcontentloaded", "networkidle",
+        "networkidle:MS" (with a cap of MS milliseconds) or "selector:CSS".
+        """
+        wait_until, separator, value = spec.partition(":")
+        if wait_until == "selector":
+            if not value.strip():
+                raise ValueError("Navigation wait 'selector:CSS' needs a CSS selector after the colon")
+            return cls("selector", wait_cap, selector=value, block_resources=block_resources)
+        if wait_until == "networkidle" and separator:
+            try:
+                wait_cap = float(value)
+            except ValueError:
+                raise ValueError(f"Expected milliseconds after 'networkidle:', got '{value}'") from None
+            if wait_cap <= 0:
+                raise ValueError(f"The networkidle cap must be positive, got {value}")
+        elif separator:
+            raise ValueError(f"Navigation wait '{wait_until}' takes no value, got '{spec}'")
+        return cls(wait_until, wait_cap, block_resources=block_resources)
+
+    def __str__(self) -> str:
+        if self.wait_until == "networkidle":
+            return f"networkidle, max {self.wait_cap:.0f} ms"
+        if self.wait_until == "selector":
+            return f"selector {self.selector!r}"
+        return self.wait_until
+
+    async def goto(self, page: Page, url: str) -> Optional[str]:
+        """Navigate `page` to `url` and wait as configured. Returns a note if the wait was cut off."""
+        if self.wait_until in ("load", "domcontentloaded"):
+            await page.goto(url, wait_until=self.wait_until)
+            return None
+        await page.goto(url, wait_until="domcontentloaded")
+        try:
+            if self.wait_until == "networkidle":
+                await page.wait_for_load_state("networkidle", timeout=self.wait_cap)
+            else:
+                await page.wait_for_selector(self.selector, state="attached", timeout=self.wait_cap)
+        except PlaywrightTimeoutError:
+            return f"gave up waiting after {self.wait_cap:.0f} ms"
+        return None
+
+
+def navigation_spec(spec: str) -> str:
+    """argparse type of --navigation-wait: checks that `spec` parses into a policy."""
+    try:
+        NavigationPolicy.from_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return spec
+
+
+def session_navigation_spec(item: str) -> str:
+    """argparse type of --session-navigation: checks that `item` is SESSION=SPEC with a valid SPEC."""
+    try:
+        session_navigation([item])
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return item
+
+
+def session_navigation(specs: list, block_resources: tuple = ()) -> dict:
+    """Parse "NAME=SPEC" items from the command line into a policy per session name."""
+    policies = {}
+    for item in specs or []:
+        name, separator, spec = item.partition("=")
+        if not separator or not name:
+            raise ValueError(f"Expected SESSION=POLICY, got '{item}'")
+        policies[name] = NavigationPolicy.from_spec(spec, block_resources)
+    return policies
+
+
+class BrowserSessions:
+    """
+    The named browser sessions of one playbook generation, each with its own context in the
+    shared pool. Generations running side by side can therefore use the same session names.
+    """
+    def __init__(
+            self,
+            pool: BrowserPool,
+            max_sessions: int = 4,
+            default_timeout: Optional[float] = None,
+            navigation: Optional[NavigationPolicy] = None,
+            session_navigation: Optional[dict] = None
+    ):
+        self.pool = pool
+        self.max_sessions = max_sessions
+        # timeout in milliseconds for navigation and actions, Playwright's default if None
+        self.default_timeout = default_timeout
+        # navigation policy of every session, unless `session_navigation` has one for its name
+        self.navigation = navigation or NavigationPolicy()
+        self.session_navigation = session_navigation or {}
+        # session name -> (context, page), least recently used first
+        self._sessions: "OrderedDict[str, tuple[BrowserContext, Page]]" = OrderedDict()
+        # session name -> [number of blocked requests]
+        self._blocked: dict = {}
+        # names of the sessions closed to stay within max_sessions
+        self.evicted: set = set()
+
+    def navigation_policy(self, name: str) -> NavigationPolicy:
+        return self.session_navigation.get(name, self.navigation)
+
+    async def new_session(self, name: str) -> Page:
+        """
+        Create a fresh context and page for the session `name`. An existing session of the
+        same name is closed first. If the limit is reached, the least recently used session is
+        closed to keep memory bounded.
+        """
+        await self.close_session(name)
+        while len(self._sessions) >= self.max_sessions:
+            evicted = next(iter(self._sessions))
+            print(f"Closing least recently used session '{evicted}' (max {self.max_sessions} sessions)")
+            await self.close_session(evicted)
+            self.evicted.add(evicted)
+        self.evicted.discard(name)
+
+        start = time.perf_counter()
+        context = await self.pool.new_context()
+        if self.default_timeout is not None:
+            context.set_default_timeout(self.default_timeout)
+        policy = self.navigation_policy(name)
+        if policy.block_resources:
+            blocked = self._blocked[name] = [0]
+
+            async def block(route: Route) -> None:
+                if route.request.resource_type in policy.block_resources:
+                    blocked[0] += 1
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", block)
+        page = await context.new_page()
+        self._sessions[name] = (context, page)
+        print(f"Session '{name}' ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return page
+
+    def get_page(self, name: str) -> Optional[Page]:
+        """Return the page of session `name`, or None if there is no such session."""
+        if name not in self._sessions:
+            return None
+        self._sessions.move_to_end(name)
+        return self._sessions[name][1]
+
+    async def navigate(self, name: str, url: str) -> None:
+        """Navigate the page of session `name` to `url` with the session's policy and print the timing."""
+        page = self.get_page(name)
+        policy = self.navigation_policy(name)
+        blocked = self._blocked.get(name, [0])
+        blocked_before = blocked[0]
+        start = time.perf_counter()
+        note = await policy.goto(page, url)
+        details = [str(policy)]
+        if policy.block_resources:
+            details.append(f"{blocked[0] - blocked_before} requests blocked")
+        if note:
+            details.append(note)
+        print(f"Session '{name}' navigated to {url} in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"({', '.join(details)})")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sessions
+
+    async def close_session(self, name: str) -> None:
+        """Close the context of session `name`, if it exists."""
+        session = self._sessions.pop(name, None)
+        self._blocked.pop(name, None)
+        if session is not None:
+            await session[0].close()
+
+    async def close(self) -> None:
+        """Close all sessions of this generation. The shared browser stays open."""
+        for name in list(self._sessions):
+            await self.close_session(name)
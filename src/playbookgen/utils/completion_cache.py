@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+from openai.types.chat import ChatCompletion
+
+
+def _to_jsonable(value):
+    """Turn messages (dicts or openai response objects) into plain JSON-compatible data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+class CompletionCache:
+    """
+    Content-addressed disk cache for chat completions. Entries are keyed by a hash of the model,
+    messages and tool schemas, so a byte-identical request is answered from disk. Entries older
+    than `max_age_days` are dropped, and the least recently used entries are evicted once the
+    cache grows beyond `max_size_mb`. Each entry stores when it was written, as the modification
+    time of its file is updated on every hit to keep the least recently used order.
+    """
+    def __init__(self, directory: str = ".completion_cache", max_size_mb: float = 256, max_age_days: float = 30):
+        self.directory = directory
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        # path -> (last use, size, creation time); scanned once, then kept up to date by get/put.
+        # Until an entry is read, its last use stands in for its creation time, which is never later.
+        self._entries = {}
+        os.makedirs(directory, exist_ok=True)
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(".json"):
+                    path = os.path.join(root, file)
+                    stat = os.stat(path)
+                    self._entries[path] = (stat.st_mtime, stat.st_size, stat.st_mtime)
+        self.evict()
+
+    @staticmethod
+    def key(model: str, messages: list, tools: list) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": _to_jsonable(messages), "tools": tools},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        """Return the cached completion for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        now = time.time()
+        # entries without a creation time were written by an older version of the cache
+        if "cached_at" not in data or now - data["cached_at"] > self.max_age:
+            self._remove(path)
+            self.misses += 1
+            return None
+        # touch the entry so eviction removes the least recently used entries first
+        os.utime(path, (now, now))
+        self._entries[path] = (now, os.path.getsize(path), data["cached_at"])
+        self.hits += 1
+        return ChatCompletion.model_validate(data["completion"])
+
+    def put(self, key: str, response: ChatCompletion) -> None:
+        """Store `response` under `key` and evict old entries if the cache got too large."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        now = time.time()
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cached_at": now, "completion": response.model_dump()}, f)
+        os.replace(tmp_path, path)
+        self._entries[path] = (now, os.path.getsize(path), now)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove expired entries, then the least recently used ones until the size limit holds."""
+        now = time.time()
+        for path, (_, _, created) in list(self._entries.items()):
+            if now - created > self.max_age:
+                self._remove(path)
+
+        total_size = sum(size for _, size, _ in self._entries.values())
+        if total_size <= self.max_size:
+            return
+        for path, (_, size, _) in sorted(self._entries.items(), key=lambda entry: entry[1][0]):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def _remove(self, path: str) -> None:
+        self._entries.pop(path, None)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0.0
+        return f"Completion cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
@@ -0,0 +1,136 @@
+import json
+from functools import lru_cache
+from typing import Optional
+from playbookgen.utils.snapshot_format import count_tokens, is_full_snapshot
+
+
+SNAPSHOT_TOOL = "get_interactive_elements"
+
+# rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=4096)
+def _cached_tokens(text: str) -> int:
+    return count_tokens(text)
+
+
+def _field(message, key):
+    """Read a field of a message that is either a plain dict or an openai message object."""
+    if isinstance(message, dict):
+        return message.get(key)
+    return getattr(message, key, None)
+
+
+def _tool_calls(message) -> list:
+    """(id, name, arguments) of every tool call in an assistant message."""
+    calls = []
+    for call in _field(message, "tool_calls") or []:
+        function = _field(call, "function")
+        calls.append((_field(call, "id"), _field(function, "name"), _field(function, "arguments") or ""))
+    return calls
+
+
+def message_tokens(message) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + _cached_tokens(_field(message, "content") or "")
+    for _, name, arguments in _tool_calls(message):
+        tokens += _cached_tokens(name or "") + _cached_tokens(arguments)
+    return tokens
+
+
+def summarize_snapshot(content: str) -> str:
+    """Short stand-in for an element snapshot that is no longer sent verbatim."""
+    lines = content.splitlines()
+    header = lines[0] if lines and not content.lstrip().startswith(("[", "{")) else "element snapshot (JSON)"
+    return (
+        f"[Older snapshot compacted: {header}; {len(lines)} lines omitted. "
+        f"Call {SNAPSHOT_TOOL} with full=true for the current elements.]"
+    )
+
+
+class ContextCompactor:
+    """
+    Bounds the prompt size of each completion. The most recent element snapshots (and the latest
+    full snapshot of each session) are kept verbatim, older ones are replaced by one-line
+    summaries. If the prompt is still above `token_ceiling`, the kept snapshots are summarized as
+    well, oldest first, down to the very last one. The conversation history itself is not changed.
+    """
+    def __init__(self, keep_snapshots: int = 3, token_ceiling: Optional[int] = None):
+        self.keep_snapshots = keep_snapshots
+        self.token_ceiling = token_ceiling
+        self.last_report = None
+
+    def compact(self, messages: list) -> list:
+        """Return the messages to send, with older element snapshots replaced by summaries."""
+        calls = {}
+        for message in messages:
+            for call_id, name, arguments in _tool_calls(message):
+                calls[call_id] = (name, arguments)
+
+        # positions of the snapshot results, oldest first
+        snapshots = [
+            position for position, message in enumerate(messages)
+            if _field(message, "role") == "tool"
+            and calls.get(_field(message, "tool_call_id"), (None,))[0] == SNAPSHOT_TOOL
+        ]
+        kept = set(snapshots[-self.keep_snapshots:]) if self.keep_snapshots > 0 else set()
+        kept |= self._latest_full_snapshots(messages, snapshots, calls)
+
+        tokens = [message_tokens(message) for message in messages]
+        before = sum(tokens)
+        compacted = list(messages)
+        summarized = 0
+
+        def summarize(position) -> int:
+            message = messages[position]
+            replacement = {
+                "role": "tool",
+                "tool_call_id": _field(message, "tool_call_id"),
+                "content": summarize_snapshot(_field(message, "content") or ""),
+            }
+            replacement_tokens = message_tokens(replacement)
+            # small diffs are cheaper than their summary, so they stay as they are
+            if replacement_tokens >= tokens[position]:
+                return 0
+            compacted[position] = replacement
+            tokens[position] = replacement_tokens
+            return 1
+
+        for position in snapshots:
+            if position not in kept:
+                summarized += summarize(position)
+
+        if self.token_ceiling is not None:
+            for position in sorted(kept)[:-1]:
+                if sum(tokens) <= self.token_ceiling:
+                    break
+                summarized += summarize(position)
+
+        after = sum(tokens)
+        self.last_report = {"before": before, "after": after, "summarized": summarized}
+        return compacted
+
+    @staticmethod
+    def _latest_full_snapshots(messages: list, snapshots: list, calls: dict) -> set:
+        """Position of the most recent full (not incremental) snapshot of each session."""
+        latest = {}
+        for position in snapshots:
+            message = messages[position]
+            if not is_full_snapshot(_field(message, "content") or ""):
+                continue
+            _, arguments = calls[_field(message, "tool_call_id")]
+            try:
+                session = json.loads(arguments).get("session_id")
+            except (ValueError, AttributeError):
+                session = None
+            latest[session] = position
+        return set(latest.values())
+
+    def report(self) -> str:
+        stats = self.last_report
+        if stats is None:
+            return "Context: not compacted yet."
+        return (
+            f"Context: {stats['before']} tokens before, {stats['after']} tokens after compaction "
+            f"({stats['summarized']} snapshots summarized)"
+        )
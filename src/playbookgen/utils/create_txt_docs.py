@@ -1,7 +1,15 @@
+import argparse
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathspec import PathSpec
 
 
+SEPARATOR = ('\n' + '-' * 28 + '\n\n').encode('utf-8')
+
+
 def load_gitignore_patterns(script_dir):
     """
     Load and parse patterns from a .gitignore file in the given directory.
@@ -19,70 +27,198 @@ def load_gitignore_patterns(script_dir):
     return None
 
 
-def write_files_to_txt(output_file='output', max_file_size_mb=5):
+def is_output_file(path, output_file):
+    """Whether `path` is one of the output files, their temporary files or the manifest of `output_file`."""
+    prefix = os.path.abspath(output_file) + '_'
+    path = os.path.abspath(path)
+    return path.startswith(prefix) and (path == prefix + 'manifest.json' or path.endswith(('.txt', '.txt.tmp')))
+
+
+def collect_source_files(source_dir, output_file=None):
+    """
+    List the files to include, relative to the source directory and in a stable order.
+
+    Parameters:
+        source_dir (str): Directory to walk.
+        output_file (str): Base name of the output files, which are excluded along with the manifest,
+            and so is their directory if it lies below the source directory.
+
+    Returns:
+        list: Relative paths of the files, sorted by directory and name.
+    """
+    spec = load_gitignore_patterns(source_dir)
+    script_path = os.path.abspath(__file__)
+    output_dir = os.path.dirname(os.path.abspath(output_file)) if output_file else None
+    relative_paths = []
+    for root, dirs, files in os.walk(source_dir):
+        # Exclude hidden directories, image folders and the output directory
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d.lower() != 'images'
+                         and os.path.abspath(os.path.join(root, d)) != output_dir)
+
+        for file in sorted(files):
+            # Skip hidden files, image files, and the script itself
+            if file.startswith('.') or file.lower().endswith(('.png', '.gif')):
+                continue
+            file_path = os.path.join(root, file)
+            if os.path.abspath(file_path) == script_path or file == os.path.basename(script_path):
+                continue
+            if output_file and is_output_file(file_path, output_file):
+                continue
+            relative_path = os.path.relpath(file_path, source_dir)
+
+            # Skip files matching .gitignore patterns
+            if spec and spec.match_file(relative_path):
+                continue
+            relative_paths.append(relative_path)
+    return relative_paths
+
+
+def read_entry(source_dir, relative_path):
+    """
+    Read one source file and encode its entry (header, content and separator) as UTF-8.
+
+    Returns:
+        tuple: The entry bytes and the SHA-256 of the raw file content.
+    """
+    file_header = f"{relative_path}\nfile content ...\n\n".encode('utf-8')
+    try:
+        with open(os.path.join(source_dir, relative_path), 'rb') as infile:
+            raw = infile.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        content = raw.decode('utf-8', errors='ignore').encode('utf-8')
+    except Exception as e:
+        digest = None
+        content = f"Error reading file: {e}\n".encode('utf-8')
+    return file_header + content + SEPARATOR, digest
+
+
+def output_path(output_file, index):
+    return f"{output_file}_{index}.txt"
+
+
+def load_manifest(manifest_path):
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return None
+
+
+def write_files_to_txt(output_file='output', max_file_size_mb=5, source_dir=None, workers=8):
     """
     Write file paths and contents to text files, applying exclusions and size limits.
 
+    A manifest next to the output files records the mtime, size and hash of every source file and
+    where its entry was written. On the next run only files whose mtime or size changed are read
+    (in parallel), the entries of unchanged files are copied from the previous output, and nothing
+    is rewritten if no content changed. Output files are split at entry boundaries so that none
+    exceeds the limit in encoded bytes, unless a single entry is larger than the limit.
+
     Parameters:
         output_file (str): Base name for output files (default: 'output').
         max_file_size_mb (int): Maximum size of each output file in MB (default: 5).
+        source_dir (str): Directory to collect the files from (default: the directory of this script).
+        workers (int): Number of threads reading changed files (default: 8).
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    spec = load_gitignore_patterns(script_dir)
-
+    start = time.perf_counter()
+    source_dir = source_dir or os.path.dirname(os.path.abspath(__file__))
+    max_bytes = max_file_size_mb * 1024 * 1024
+    manifest_path = f"{output_file}_manifest.json"
+
+    previous = load_manifest(manifest_path)
+    if previous is not None and (
+            previous.get('max_file_size_mb') != max_file_size_mb
+            or not all(os.path.exists(output_path(output_file, i)) for i in range(1, previous['outputs'] + 1))
+    ):
+        previous = None  # outputs cannot be reused, rebuild them from the sources
+    old_files = previous['files'] if previous else {}
+
+    relative_paths = collect_source_files(source_dir, output_file)
+    stats = {}
+    changed = []
+    for relative_path in relative_paths:
+        stat = os.stat(os.path.join(source_dir, relative_path))
+        stats[relative_path] = (stat.st_mtime_ns, stat.st_size)
+        old = old_files.get(relative_path)
+        if old is None or (old['mtime_ns'], old['size']) != stats[relative_path]:
+            changed.append(relative_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        entries = dict(zip(changed, pool.map(lambda path: read_entry(source_dir, path), changed)))
+
+    # files touched without a content change keep their previous entry
+    modified = [path for path in changed if old_files.get(path, {}).get('sha256') != entries[path][1]
+                or entries[path][1] is None]
+    unchanged_layout = list(old_files) == relative_paths
+    if previous is not None and not modified and unchanged_layout:
+        for path in changed:
+            old_files[path].update(mtime_ns=stats[path][0], size=stats[path][1])
+        if changed:
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(previous, f, indent=1)
+        print(f"{len(relative_paths)} files unchanged, {len(changed)} re-read, "
+              f"nothing to write ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return
+
+    old_outputs = {}
+    files = {}
     current_file_index = 1
-    current_file_path = f"{output_file}_{current_file_index}.txt"
     current_file_size = 0
-
-    outfile = open(current_file_path, 'w', encoding='utf-8')
-
+    outfile = open(output_path(output_file, current_file_index) + '.tmp', 'wb')
     try:
-        for root, dirs, files in os.walk(script_dir):
-            # Exclude hidden directories and image folders
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d.lower() != 'images']
-
-            for file in files:
-                # Skip hidden files, image files, and the script itself
-                if file.startswith('.') or file == os.path.basename(__file__) or file.lower().endswith(
-                        ('.png', '.gif')):
-                    continue
-
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, script_dir)
-
-                # Skip files matching .gitignore patterns
-                if spec and spec.match_file(relative_path):
-                    continue
-
-                file_header = f"{relative_path}\nfile content ...\n\n"
-
-                # Check file size and switch to a new file if needed
-                if current_file_size + len(file_header) >= max_file_size_mb * 1024 * 1024:
-                    outfile.close()
-                    current_file_index += 1
-                    current_file_path = f"{output_file}_{current_file_index}.txt"
-                    outfile = open(current_file_path, 'w', encoding='utf-8')
-                    current_file_size = 0
-
-                outfile.write(file_header)
-                current_file_size += len(file_header)
-
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as infile:
-                        content = infile.read()
-                        outfile.write(content)
-                        current_file_size += len(content)
-                except Exception as e:
-                    error_message = f"Error reading file: {e}\n"
-                    outfile.write(error_message)
-                    current_file_size += len(error_message)
-
-                separator = '\n' + '-' * 28 + '\n\n'
-                outfile.write(separator)
-                current_file_size += len(separator)
+        for relative_path in relative_paths:
+            if relative_path in entries:
+                entry, digest = entries[relative_path]
+            else:
+                # copy the entry of an unchanged file from the previous output
+                old = old_files[relative_path]
+                if old['output'] not in old_outputs:
+                    old_outputs[old['output']] = open(output_path(output_file, old['output']), 'rb')
+                old_output = old_outputs[old['output']]
+                old_output.seek(old['offset'])
+                entry, digest = old_output.read(old['length']), old['sha256']
+
+            # Check file size and switch to a new file if needed
+            if current_file_size and current_file_size + len(entry) > max_bytes:
+                outfile.close()
+                current_file_index += 1
+                outfile = open(output_path(output_file, current_file_index) + '.tmp', 'wb')
+                current_file_size = 0
+
+            outfile.write(entry)
+            files[relative_path] = {
+                'mtime_ns': stats[relative_path][0],
+                'size': stats[relative_path][1],
+                'sha256': digest,
+                'output': current_file_index,
+                'offset': current_file_size,
+                'length': len(entry),
+            }
+            current_file_size += len(entry)
     finally:
         outfile.close()
+        for old_output in old_outputs.values():
+            old_output.close()
+
+    for index in range(1, current_file_index + 1):
+        os.replace(output_path(output_file, index) + '.tmp', output_path(output_file, index))
+    # remove outputs of a previous run that produced more files
+    index = current_file_index + 1
+    while os.path.exists(output_path(output_file, index)):
+        os.remove(output_path(output_file, index))
+        index += 1
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'max_file_size_mb': max_file_size_mb, 'outputs': current_file_index, 'files': files}, f, indent=1)
+    print(f"{len(relative_paths)} files, {len(changed)} re-read, {len(modified)} changed, "
+          f"{current_file_index} output files written ({(time.perf_counter() - start) * 1000:.0f} ms)")
 
 
 if __name__ == '__main__':
-    write_files_to_txt()
+    parser = argparse.ArgumentParser(description="Collect the files of a source tree into text files")
+    parser.add_argument('source_dir', nargs='?', default=None,
+                        help="Directory to collect (default: the directory of this script)")
+    parser.add_argument('--output', '-o', default='output', help="Base name of the output files")
+    parser.add_argument('--max-file-size-mb', type=float, default=5, help="Maximum size of each output file")
+    parser.add_argument('--workers', type=int, default=8, help="Threads reading changed files")
+    args = parser.parse_args()
+    write_files_to_txt(args.output, args.max_file_size_mb, args.source_dir, args.workers)
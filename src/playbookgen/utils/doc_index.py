@@ -0,0 +1,208 @@
+"""
+BM25 retrieval over the AttackMate text docs (src/txt-docs), so that only the documentation
+relevant to the user's goal is sent to the model instead of all of it.
+
+The docs are split into one chunk per file section (reStructuredText and Markdown headings,
+with long sections cut at paragraph boundaries). The index is saved to a single file: a JSON
+header with the vocabulary and the array layout, followed by the postings, term frequencies,
+chunk lengths and chunk texts as raw arrays, which are memory-mapped when the index is loaded.
+
+Build the index with:
+python doc_index.py ../../txt-docs/*.txt --output ../../txt-docs/docs.bm25
+"""
+import argparse
+import json
+import math
+import os
+import re
+from typing import Optional
+
+import numpy as np
+
+
+DOCS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "txt-docs")
+DEFAULT_INDEX = os.path.join(DOCS_DIR, "docs.bm25")
+MAGIC = b"PBGBM25\x01"
+MAX_CHUNK_CHARS = 2000
+
+# entries written by create_txt_docs.py: "<path>\nfile content ...\n\n<content>\n<28 dashes>\n\n"
+ENTRY_HEADER = re.compile(r"^([^\n]+)\nfile content \.\.\.\n\n", re.MULTILINE)
+ENTRY_SEPARATOR = re.compile(r"\n-{28}\n*\Z")
+# a reStructuredText title (text underlined with = - ~ ^ or *) or a Markdown heading
+HEADING = re.compile(r"^(?:(?P<rst>[^\n]*\w[^\n]*)\n(?P<line>[=\-~^*])(?P=line){2,}[ \t]*$|#{1,4} (?P<md>[^\n]+)$)",
+                     re.MULTILINE)
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric words; identifiers like "creates_session" are split into their parts."""
+    return TOKEN.findall(text.lower())
+
+
+def split_entries(text: str) -> list:
+    """Split a txt-docs file into (path, content) pairs."""
+    headers = list(ENTRY_HEADER.finditer(text))
+    entries = []
+    for header, following in zip(headers, headers[1:] + [None]):
+        content = text[header.end():following.start() if following else len(text)]
+        entries.append((header.group(1).strip(), ENTRY_SEPARATOR.sub("", content).strip()))
+    return entries
+
+
+def split_sections(path: str, content: str) -> list:
+    """Split the content of one file at its headings into (title, text) chunks of bounded size."""
+    starts = [match.start() for match in HEADING.finditer(content)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    chunks = []
+    for start, end in zip(starts, starts[1:] + [len(content)]):
+        section = content[start:end].strip()
+        if not section:
+            continue
+        heading = HEADING.match(section)
+        title = f"{path} > {(heading.group('rst') or heading.group('md')).strip()}" if heading else path
+        # long sections are cut at paragraph boundaries
+        part = ""
+        for paragraph in section.split("\n\n"):
+            if part and len(part) + len(paragraph) > MAX_CHUNK_CHARS:
+                chunks.append((title, part.strip()))
+                part = ""
+            part += paragraph + "\n\n"
+        if part.strip():
+            chunks.append((title, part.strip()))
+    return chunks
+
+
+def chunk_docs(paths: list) -> list:
+    """All (title, text) chunks of the given txt-docs files."""
+    chunks = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        for entry_path, content in split_entries(text) or [(os.path.basename(path), text)]:
+            chunks.extend(split_sections(entry_path, content))
+    return chunks
+
+
+def build_index(paths: list, output_file: str, k1: float = 1.2, b: float = 0.75) -> int:
+    """Chunk the docs, build the BM25 postings and save them to `output_file`. Returns the number of chunks."""
+    chunks = chunk_docs(paths)
+    vocabulary = {}
+    postings = []  # per term: list of (chunk, term frequency)
+    lengths = np.zeros(len(chunks), dtype=np.float32)
+    for chunk_id, (title, text) in enumerate(chunks):
+        counts = {}
+        tokens = tokenize(f"{title}\n{text}")
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        lengths[chunk_id] = len(tokens)
+        for token, count in counts.items():
+            term = vocabulary.setdefault(token, len(vocabulary))
+            if term == len(postings):
+                postings.append([])
+            postings[term].append((chunk_id, count))
+
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(p) for p in postings])
+    doc_ids = np.array([chunk for p in postings for chunk, _ in p], dtype=np.int32)
+    frequencies = np.array([count for p in postings for _, count in p], dtype=np.float32)
+    texts = [f"# {title}\n{text}".encode("utf-8") for title, text in chunks]
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(t) for t in texts])
+    arrays = {
+        "offsets": offsets,
+        "doc_ids": doc_ids,
+        "frequencies": frequencies,
+        "lengths": lengths,
+        "text_offsets": text_offsets,
+        "texts": np.frombuffer(b"".join(texts), dtype=np.uint8),
+    }
+
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        position = (position + 7) // 8 * 8
+        layout[name] = {"offset": position, "dtype": array.dtype.str, "shape": array.shape}
+        position += array.nbytes
+    header = json.dumps({"k1": k1, "b": b, "vocabulary": vocabulary, "arrays": layout}).encode("utf-8")
+    data_start = (len(MAGIC) + 8 + len(header) + 7) // 8 * 8
+
+    with open(output_file, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+    return len(chunks)
+
+
+class DocIndex:
+    """A BM25 index file built by `build_index`, memory-mapped for querying."""
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a documentation index")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        data_start = (len(MAGIC) + 8 + header_length + 7) // 8 * 8
+        self.k1 = header["k1"]
+        self.b = header["b"]
+        self.vocabulary = header["vocabulary"]
+        for name, spec in header["arrays"].items():
+            shape = tuple(spec["shape"])
+            array = (np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+                     if math.prod(shape) else np.empty(shape, dtype=spec["dtype"]))
+            setattr(self, name, array)
+        self.average_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def text(self, chunk_id: int) -> str:
+        start, end = self.text_offsets[chunk_id], self.text_offsets[chunk_id + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        """The `top_k` chunks with the highest BM25 score for `query`, as (score, text) pairs."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.average_length, 1.0))
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.frequencies[start:end]
+            idf = math.log(1 + (len(self) - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        top_k = min(top_k, int(np.count_nonzero(scores)))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), self.text(int(i))) for i in best]
+
+
+def load_or_build(index_file: Optional[str] = None, docs_dir: str = DOCS_DIR) -> DocIndex:
+    """Load the index, building it from the txt-docs first if it is missing or older than the docs."""
+    index_file = index_file or DEFAULT_INDEX
+    doc_paths = sorted(os.path.join(docs_dir, name) for name in os.listdir(docs_dir) if name.endswith(".txt"))
+    newest_doc = max((os.path.getmtime(path) for path in doc_paths), default=0)
+    if not os.path.exists(index_file) or os.path.getmtime(index_file) < newest_doc:
+        count = build_index(doc_paths, index_file)
+        print(f"Built documentation index with {count} chunks: {index_file}")
+    return DocIndex(index_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the BM25 index of the AttackMate docs")
+    parser.add_argument("docs", nargs="*", help="txt-docs files to index (default: all in src/txt-docs)")
+    parser.add_argument("--output", "-o", default=DEFAULT_INDEX, help="Index file")
+    parser.add_argument("--query", "-q", default=None, help="Query the index instead of building it")
+    parser.add_argument("--top-k", "-k", type=int, default=5)
+    args = parser.parse_args()
+    if args.query:
+        for score, text in DocIndex(args.output).search(args.query, args.top_k):
+            print(f"[{score:.2f}] {text[:300]}\n")
+    else:
+        docs = args.docs or sorted(os.path.join(DOCS_DIR, n) for n in os.listdir(DOCS_DIR) if n.endswith(".txt"))
+        print(f"Indexed {build_index(docs, args.output)} chunks into {args.output}")
@@ -0,0 +1,147 @@
+from typing import Sequence
+from playwright.async_api import Page
+from playbookgen.utils.browser_helpers import (
+    INTERACTIVE_SELECTOR,
+    SELECTOR_ENGINE_JS,
+    ELEMENT_RECORD_JS,
+)
+
+
+# Installs a MutationObserver on first use in a document and keeps the previous snapshot in the
+# page, keyed by stable element refs. A snapshot is only re-extracted when the DOM (or a form
+# value) changed since the last call, and only the differences are sent back. A new document or
+# a changed URL has no previous snapshot, so the first call after a navigation is always full.
+TRACKED_SNAPSHOT_JS = """
+(args) => {
+    %s
+    %s
+    let tracker = window.__playbookgenTracker;
+    if (!tracker) {
+        tracker = window.__playbookgenTracker = {
+            href: location.href, refs: new WeakMap(), nextRef: 0, previous: null, dirty: true,
+        };
+        const markDirty = () => { tracker.dirty = true; };
+        new MutationObserver(markDirty).observe(document, {
+            subtree: true, childList: true, attributes: true, characterData: true,
+        });
+        document.addEventListener('input', markDirty, true);
+        document.addEventListener('change', markDirty, true);
+    }
+    if (args.reset || tracker.href !== location.href) {
+        tracker.href = location.href;
+        tracker.previous = null;
+    }
+
+    const full = tracker.previous === null;
+    if (!full && !tracker.dirty) {
+        return {full: false, added: [], changed: [], removed: [], order: null, total: tracker.previous.size};
+    }
+    tracker.dirty = false;
+
+    const selectors = createSelectorEngine();
+    const records = [];
+    const current = new Map();
+    document.querySelectorAll(args.query).forEach((el, i) => {
+        let ref = tracker.refs.get(el);
+        if (!ref) {
+            ref = 'e' + (++tracker.nextRef);
+            tracker.refs.set(el, ref);
+        }
+        const described = describeElement(el, i + 1, selectors);
+        described.ref = ref;
+        const record = {};
+        args.fields.forEach((key) => { record[key] = described[key]; });
+        records.push(record);
+        // positions and layout shift whenever something is inserted, so they do not count as changes
+        const {index, bounding_box, ...compared} = record;
+        current.set(ref, JSON.stringify(compared));
+    });
+    const order = records.map((record) => record.ref);
+
+    if (full) {
+        tracker.previous = current;
+        return {full: true, elements: records, added: [], changed: [], removed: [], order, total: records.length};
+    }
+
+    const added = [];
+    const changed = [];
+    const removed = [];
+    records.forEach((record) => {
+        const previous = tracker.previous.get(record.ref);
+        if (previous === undefined) {
+            added.push(record);
+        } else if (previous !== current.get(record.ref)) {
+            changed.push(record);
+        }
+    });
+    tracker.previous.forEach((_, ref) => {
+        if (!current.has(ref)) removed.push(ref);
+    });
+    tracker.previous = current;
+    return {full: false, added, changed, removed, order, total: records.length};
+}
+""" % (SELECTOR_ENGINE_JS, ELEMENT_RECORD_JS)
+
+# Removes elements from the previous snapshot in the page, so that the next diff returns them as added.
+FORGET_JS = """
+(refs) => {
+    const tracker = window.__playbookgenTracker;
+    if (!tracker || tracker.previous === null) return;
+    refs.forEach((ref) => tracker.previous.delete(ref));
+    tracker.dirty = true;
+}
+"""
+
+
+class SnapshotTracker:
+    """Keeps the previous element snapshot of a session and fetches only what changed since."""
+    def __init__(self):
+        self.elements = {}  # ref -> element, in document order
+
+    async def snapshot(self, page: Page, fields: Sequence[str], full: bool = False) -> dict:
+        """
+        Take a snapshot of the interactive elements of `page`.
+
+        Returns a dict with `full` set and all `elements` on the first call, after a navigation or
+        if `full` is requested. Otherwise only the `added` and `changed` elements and the refs of
+        the `removed` ones are returned. `total` is the number of elements on the page.
+        """
+        fields = list(fields)
+        if "ref" not in fields:
+            fields.insert(0, "ref")
+        result = await page.evaluate(TRACKED_SNAPSHOT_JS, {
+            "query": INTERACTIVE_SELECTOR,
+            "fields": fields,
+            "reset": full,
+        })
+        self._apply(result)
+        return result
+
+    async def forget(self, page: Page, refs: Sequence[str]) -> None:
+        """
+        Mark elements of the last snapshot as not sent, e.g. because they were cut off at the token
+        budget, so that the next snapshot returns them as added instead of leaving them out.
+        """
+        if refs:
+            await page.evaluate(FORGET_JS, list(refs))
+
+    def _apply(self, result: dict) -> None:
+        if result["full"]:
+            self.elements = {elem["ref"]: elem for elem in result["elements"]}
+            return
+        if result["order"] is None:
+            return
+        for ref in result["removed"]:
+            self.elements.pop(ref, None)
+        for elem in result["added"] + result["changed"]:
+            self.elements[elem["ref"]] = elem
+        reordered = {}
+        for position, ref in enumerate(result["order"], start=1):
+            elem = self.elements[ref]
+            elem["index"] = position
+            reordered[ref] = elem
+        self.elements = reordered
+
+    def current_elements(self) -> list:
+        """All elements of the last snapshot, with the changes applied."""
+        return list(self.elements.values())
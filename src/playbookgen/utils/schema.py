@@ -1,16 +1,56 @@
 import inspect
+import types
+from typing import Any, Literal, Union, get_args, get_origin
 
-def function_to_schema(func) -> dict:
-    type_map = {
-        str: "string",
-        int: "integer",
-        float: "number",
-        bool: "boolean",
-        list: "array",
-        dict: "object",
-        type(None): "null",
-    }
+TYPE_MAP = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+    type(None): "null",
+}
+
+
+def annotation_to_schema(annotation) -> dict:
+    """
+    Translate a parameter annotation into a JSON schema. Handles the base types, Optional/Union,
+    Literal and list[...] annotations; anything else (or a missing annotation) becomes a string.
+    """
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return {"type": "string"}
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+
+    if origin is Union or origin is types.UnionType:
+        options = [arg for arg in args if arg is not type(None)]
+        if len(options) == 1:
+            # Optional[X]: the parameter has a default, so X alone describes the accepted values
+            return annotation_to_schema(options[0])
+        return {"anyOf": [annotation_to_schema(option) for option in options]}
+
+    if origin is Literal:
+        literal_types = {TYPE_MAP.get(type(value), "string") for value in args}
+        schema = {"enum": list(args)}
+        if len(literal_types) == 1:
+            schema["type"] = literal_types.pop()
+        return schema
 
+    if origin in (list, tuple, set):
+        schema = {"type": "array"}
+        if args and args[0] is not Ellipsis:
+            schema["items"] = annotation_to_schema(args[0])
+        return schema
+
+    if origin is dict:
+        return {"type": "object"}
+
+    return {"type": TYPE_MAP.get(annotation, "string")}
+
+
+def function_to_schema(func) -> dict:
     try:
         signature = inspect.signature(func)
     except ValueError as e:
@@ -20,13 +60,7 @@ def function_to_schema(func) -> dict:
 
     parameters = {}
     for param in signature.parameters.values():
-        try:
-            param_type = type_map.get(param.annotation, "string")
-        except KeyError as e:
-            raise KeyError(
-                f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
-            )
-        parameters[param.name] = {"type": param_type}
+        parameters[param.name] = annotation_to_schema(param.annotation)
 
     required = [
         param.name
@@ -38,11 +72,11 @@ def function_to_schema(func) -> dict:
         "type": "function",
         "function": {
             "name": func.__name__,
-            "description": (func.__doc__ or "").strip(),
+            "description": inspect.getdoc(func) or "",
             "parameters": {
                 "type": "object",
                 "properties": parameters,
                 "required": required,
             },
         },
-    }
\ No newline at end of file
+    }
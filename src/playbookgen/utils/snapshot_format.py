@@ -0,0 +1,238 @@
+import json
+import re
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional, token counts fall back to an estimate
+    tiktoken = None
+
+
+SNAPSHOT_FORMATS = ("compact", "table", "json")
+
+# Longest element text that is passed on verbatim; longer texts are clipped.
+MAX_TEXT_LENGTH = 80
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of `text` with the tokenizer of the gpt-4.1 family if tiktoken is
+    installed, otherwise estimate them with the usual ~4 characters per token rule.
+    """
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _clip(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) > MAX_TEXT_LENGTH:
+        return text[:MAX_TEXT_LENGTH - 1] + "…"
+    return text
+
+
+_FULL_SNAPSHOT_PATTERN = re.compile(r"^\s*(\[|\d+ interactive elements as )")
+
+
+def is_full_snapshot(text: str) -> bool:
+    """Whether `text` is a complete element snapshot, as opposed to a diff or an error message."""
+    return bool(_FULL_SNAPSHOT_PATTERN.match(text))
+
+
+def format_element_line(element: dict) -> str:
+    """
+    One-line form of an element without the empty fields, led by its ref (or index), e.g.:
+    e3 INPUT css=form#login > input:nth-of-type(1) type=text class=form-control
+    """
+    parts = [str(element.get("ref") or element["index"]), element["tag"], element["selector"]]
+    text = _clip(element.get("text") or "")
+    if text:
+        parts.append(json.dumps(text, ensure_ascii=False))
+    for key in ("type", "id", "class"):
+        value = element.get(key)
+        if value:
+            parts.append(f"{key}={_clip(value)}")
+    return " ".join(parts)
+
+
+def format_element_row(element: dict) -> str:
+    """Row of the columnar form: ref|tag|selector|text|type|id|class with empty cells for nulls."""
+    cells = [str(element.get("ref") or element["index"]), element["tag"], element["selector"]]
+    cells += [_clip(element.get(key) or "").replace("|", "/") for key in ("text", "type", "id", "class")]
+    return "|".join(cells)
+
+
+class SnapshotFormatter:
+    """Encodes element snapshots for the model, optionally within a token budget."""
+    def __init__(self, fmt: str = "compact", token_budget: Optional[int] = None):
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format '{fmt}', expected one of {SNAPSHOT_FORMATS}")
+        self.fmt = fmt
+        self.token_budget = token_budget
+        self.last_stats = None
+        # elements of the last snapshot that were cut off at the token budget
+        self.last_omitted = []
+
+    def format(self, elements: list) -> str:
+        """
+        Return the snapshot text for `elements` and record its token statistics in `last_stats`.
+        If the token budget is exceeded, the snapshot is cut off after the last element that
+        fits and the omitted elements are summarized per tag.
+        """
+        json_text = json.dumps(elements, indent=2)
+        if self.fmt == "json":
+            kept, omitted = self._json_within_budget(elements, lambda kept: json.dumps(kept, indent=2))
+            text = json_text if not omitted else json.dumps(kept, indent=2) + "\n" + self._summarize_omitted(omitted)
+        else:
+            header = f"{len(elements)} interactive elements as {self._legend(elements)}"
+            lines, omitted = self._encode_within_budget([header], elements)
+            text = "\n".join(lines)
+
+        self._record_stats(text, json_text, len(elements), omitted)
+        return text
+
+    def format_diff(self, diff: dict, elements: list) -> str:
+        """
+        Return the text for an incremental snapshot: the added and changed elements and the
+        refs of the removed ones. `elements` is the full current element list, which is only
+        used to compare the token usage with a full JSON snapshot.
+        """
+        json_text = json.dumps(elements, indent=2)
+        changes = diff["added"] + diff["changed"]
+        if not changes and not diff["removed"]:
+            text, omitted = f"No changes since the last snapshot ({diff['total']} interactive elements).", []
+        elif self.fmt == "json":
+            added_refs = {elem["ref"] for elem in diff["added"]}
+
+            def render(kept):
+                return json.dumps({
+                    "added": [elem for elem in kept if elem["ref"] in added_refs],
+                    "changed": [elem for elem in kept if elem["ref"] not in added_refs],
+                    "removed": diff["removed"],
+                }, indent=2)
+
+            kept, omitted = self._json_within_budget(changes, render)
+            text = render(kept)
+            if omitted:
+                text += "\n" + self._summarize_omitted(omitted)
+        else:
+            lines = [
+                f"Changes since the last snapshot ({diff['total']} interactive elements in total): "
+                f"{len(diff['added'])} added (+), {len(diff['changed'])} changed (~), "
+                f"{len(diff['removed'])} removed, as {self._legend(changes)}"
+            ]
+            if diff["removed"]:
+                lines.append("removed: " + " ".join(diff["removed"]))
+            added_refs = {elem["ref"] for elem in diff["added"]}
+            lines, omitted = self._encode_within_budget(
+                lines, changes, lambda elem: "+ " if elem["ref"] in added_refs else "~ "
+            )
+            text = "\n".join(lines)
+
+        self._record_stats(text, json_text, len(elements), omitted)
+        return text
+
+    def _legend(self, elements: list) -> str:
+        label = "ref" if elements and "ref" in elements[0] else "index"
+        if self.fmt == "table":
+            return f"{label}|tag|selector|text|type|id|class"
+        return f"{label} tag selector \"text\" attributes"
+
+    def _encode_within_budget(self, lines: list, elements: list, prefix=None):
+        encode = format_element_row if self.fmt == "table" else format_element_line
+        header_lines = len(lines)
+        used = sum(count_tokens(line) + 1 for line in lines)
+        line_tokens = []
+        omitted = []
+        for position, element in enumerate(elements):
+            line = encode(element)
+            if prefix is not None:
+                line = prefix(element) + line
+            line_tokens.append(count_tokens(line) + 1)
+            if self.token_budget is not None and used + line_tokens[-1] > self.token_budget:
+                omitted = elements[position:]
+                break
+            lines.append(line)
+            used += line_tokens[-1]
+
+        if omitted:
+            # make room for the summary line, but always keep one element so that repeated requests progress
+            reserved = self._summary_tokens(elements)
+            kept = len(lines) - header_lines
+            while kept > 1 and used + reserved > self.token_budget:
+                kept -= 1
+                used -= line_tokens[kept]
+                lines.pop()
+            if kept == 0:
+                line = encode(elements[0])
+                lines.append(prefix(elements[0]) + line if prefix is not None else line)
+                kept = 1
+            omitted = elements[kept:]
+            if omitted:
+                lines.append(self._summarize_omitted(omitted))
+        return lines, omitted
+
+    def _json_within_budget(self, elements: list, render):
+        """
+        Split `elements` into the leading ones whose JSON, as rendered by `render`, fits in the
+        token budget and the rest. The cut is estimated per element, then corrected on the result.
+        """
+        if self.token_budget is None:
+            return elements, []
+        used = count_tokens(render([]))
+        position = len(elements)
+        for index, element in enumerate(elements):
+            used += count_tokens(json.dumps(element, indent=2))
+            if used > self.token_budget:
+                position = index
+                break
+        while position > 0 and count_tokens(render(elements[:position])) > self.token_budget:
+            position -= 1
+        if position < len(elements):
+            # make room for the summary line, but always keep one element so that repeated requests progress
+            reserved = self._summary_tokens(elements)
+            while position > 1 and count_tokens(render(elements[:position])) + reserved > self.token_budget:
+                position -= 1
+            position = max(position, 1)
+        return elements[:position], elements[position:]
+
+    def _summary_tokens(self, elements: list) -> int:
+        """Upper bound of the tokens of the summary line when at most all but the first element are omitted."""
+        return count_tokens(self._summarize_omitted(elements[1:] or elements)) + 1
+
+    def _record_stats(self, text: str, json_text: str, num_elements: int, omitted: list) -> None:
+        self.last_omitted = omitted
+        self.last_stats = {
+            "elements": num_elements,
+            "omitted": len(omitted),
+            "tokens": count_tokens(text),
+            "json_tokens": count_tokens(json_text),
+        }
+
+    def _summarize_omitted(self, omitted: list) -> str:
+        per_tag = {}
+        for element in omitted:
+            per_tag[element["tag"]] = per_tag.get(element["tag"], 0) + 1
+        counts = ", ".join(f"{count} {tag}" for tag, count in per_tag.items())
+        return (
+            f"... cut off at the token budget of {self.token_budget}: {len(omitted)} more elements "
+            f"from {omitted[0].get('ref') or omitted[0]['index']} on were omitted ({counts}); "
+            f"request the snapshot again without full to get them"
+        )
+
+    def report(self) -> str:
+        """Human-readable summary of the last snapshot's token usage."""
+        stats = self.last_stats
+        if stats is None:
+            return "No snapshot formatted yet."
+        saved = 100 * (1 - stats["tokens"] / stats["json_tokens"]) if stats["json_tokens"] else 0.0
+        omitted = f", {stats['omitted']} omitted" if stats["omitted"] else ""
+        return (
+            f"Snapshot: {stats['elements']} elements{omitted}, {stats['tokens']} tokens as {self.fmt} "
+            f"vs {stats['json_tokens']} tokens as JSON ({saved:.0f}% saved)"
+        )
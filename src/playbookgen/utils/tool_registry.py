@@ -0,0 +1,154 @@
+import inspect
+import json
+import re
+from playbookgen.utils.schema import function_to_schema
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the model calls an unknown tool or passes arguments that do not fit its schema."""
+
+
+_INTEGER_PATTERN = re.compile(r"^[+-]?\d+$")
+
+
+def _describe(schema: dict) -> str:
+    if "enum" in schema:
+        return "one of " + ", ".join(json.dumps(value) for value in schema["enum"])
+    if "anyOf" in schema:
+        return " or ".join(_describe(option) for option in schema["anyOf"])
+    return {"integer": "an integer", "array": "an array", "object": "an object"}.get(
+        schema.get("type"), f"a {schema.get('type')}"
+    )
+
+
+def coerce_value(value, schema: dict, path: str):
+    """
+    Check `value` against `schema` and convert the lossless cases the model gets wrong now and
+    then (e.g. "5" for an integer, 3.0 for an integer, "true" for a boolean).
+    Raises ToolArgumentError naming `path` if the value does not fit.
+    """
+    if "anyOf" in schema:
+        for option in schema["anyOf"]:
+            try:
+                return coerce_value(value, option, path)
+            except ToolArgumentError:
+                continue
+        raise ToolArgumentError(f"'{path}' must be {_describe(schema)}, got {json.dumps(value)}")
+
+    expected = schema.get("type")
+    coerced = value
+    if expected == "integer":
+        if isinstance(value, bool):
+            coerced = None
+        elif isinstance(value, float) and value.is_integer():
+            coerced = int(value)
+        elif isinstance(value, str) and _INTEGER_PATTERN.match(value.strip()):
+            coerced = int(value.strip())
+        elif not isinstance(value, int):
+            coerced = None
+    elif expected == "number":
+        if isinstance(value, bool):
+            coerced = None
+        elif isinstance(value, str):
+            try:
+                coerced = float(value)
+            except ValueError:
+                coerced = None
+        elif not isinstance(value, (int, float)):
+            coerced = None
+    elif expected == "boolean":
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            coerced = value.strip().lower() == "true"
+        elif not isinstance(value, bool):
+            coerced = None
+    elif expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            coerced = str(value)
+        elif not isinstance(value, str):
+            coerced = None
+    elif expected == "array":
+        if not isinstance(value, list):
+            coerced = None
+        elif "items" in schema:
+            coerced = [coerce_value(item, schema["items"], f"{path}[{i}]") for i, item in enumerate(value)]
+    elif expected == "object":
+        if not isinstance(value, dict):
+            coerced = None
+
+    if coerced is None:
+        raise ToolArgumentError(f"'{path}' must be {_describe(schema)}, got {json.dumps(value)}")
+    if "enum" in schema and coerced not in schema["enum"]:
+        raise ToolArgumentError(f"'{path}' must be {_describe(schema)}, got {json.dumps(value)}")
+    return coerced
+
+
+class ToolRegistry:
+    """
+    The tools available to the agent. Schemas are compiled once when a tool is registered, and
+    the model's arguments are validated and coerced against them before the tool runs.
+    """
+    def __init__(self, tools=()):
+        self._tools = {}
+        self._schemas = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, func) -> None:
+        schema = function_to_schema(func)
+        name = schema["function"]["name"]
+        self._tools[name] = func
+        self._schemas[name] = schema
+
+    @property
+    def schemas(self) -> list:
+        """The JSON schemas of all tools, as sent to the model."""
+        return list(self._schemas.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def validate(self, name: str, arguments) -> dict:
+        """
+        Parse (if given as a JSON string), check and coerce the arguments of a call to tool `name`.
+        Raises ToolArgumentError with a precise message if the call cannot succeed.
+        """
+        if name not in self._tools:
+            raise ToolArgumentError(f"Unknown tool '{name}', available tools: {', '.join(self._tools)}")
+
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError as e:
+                raise ToolArgumentError(f"Arguments for {name} are not valid JSON: {e}")
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(f"Arguments for {name} must be a JSON object")
+
+        parameters = self._schemas[name]["function"]["parameters"]
+        properties = parameters["properties"]
+        unexpected = [key for key in arguments if key not in properties]
+        if unexpected:
+            raise ToolArgumentError(
+                f"Unexpected argument(s) for {name}: {', '.join(unexpected)}; "
+                f"accepted are {', '.join(properties)}"
+            )
+        missing = [key for key in parameters["required"] if arguments.get(key) is None]
+        if missing:
+            raise ToolArgumentError(f"Missing required argument(s) for {name}: {', '.join(missing)}")
+
+        validated = {}
+        for key, value in arguments.items():
+            # null for an optional parameter means "use the default"
+            if value is None:
+                continue
+            try:
+                validated[key] = coerce_value(value, properties[key], key)
+            except ToolArgumentError as e:
+                raise ToolArgumentError(f"Invalid argument for {name}: {e}")
+        return validated
+
+    async def call(self, name: str, arguments: dict):
+        """Run tool `name` with already validated arguments, awaiting it if it is a coroutine."""
+        result = self._tools[name](**arguments)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
@@ -0,0 +1,122 @@
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+# categories that make up a turn, in the order they are shown in the breakdown
+BREAKDOWN_CATEGORIES = ("llm", "browser", "extraction", "tool")
+
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+_current_track = contextvars.ContextVar("current_track", default="main")
+
+
+class Span:
+    """One timed operation. `args` can be extended while the span is open, e.g. with token usage."""
+    __slots__ = ("name", "category", "start", "end", "args", "turn", "track")
+
+    def __init__(self, name: str, category: str, args: dict, turn: Optional["Span"], track: str):
+        self.name = name
+        self.category = category
+        self.start = time.perf_counter()
+        self.end = None
+        self.args = args
+        self.turn = turn
+        self.track = track
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Tracer:
+    """
+    Records spans around completions, tool calls, browser actions and element extraction.
+    Spans are grouped into turns (one completion and the tool calls it made), and every turn can
+    be summarized as a latency breakdown. All spans can be exported as a Chrome trace / Perfetto
+    JSON file. Tracing is disabled by default, in which case spans cost next to nothing.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, category, args, _current_turn.get(), _current_track.get())
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            self.spans.append(span)
+
+    @contextmanager
+    def turn(self, **args):
+        """
+        A span that the spans opened inside it (also in tasks started inside it) belong to.
+        Its latency breakdown is printed when it ends.
+        """
+        with self.span("turn", "turn", **args) as span:
+            token = _current_turn.set(span)
+            try:
+                yield span
+            finally:
+                _current_turn.reset(token)
+        if span is not None:
+            print(self.turn_breakdown(span))
+
+    @staticmethod
+    def set_track(name: str) -> None:
+        """Name the track (a row in the trace viewer) of the spans of the current task."""
+        _current_track.set(name)
+
+    def turn_breakdown(self, turn: Span) -> str:
+        """Latency breakdown of a finished turn, e.g. "Turn 2: 1.93 s = llm 1.50 s + browser 0.31 s ..."."""
+        totals = dict.fromkeys(BREAKDOWN_CATEGORIES, 0.0)
+        spans = [span for span in self.spans if span.turn is turn and span.category in totals]
+        for span in spans:
+            totals[span.category] += span.duration
+        # browser actions and extraction run inside tool spans, so the tool share is what is left
+        totals["tool"] = max(0.0, totals["tool"] - totals["browser"] - totals["extraction"])
+        # tool calls of a streamed completion run while it is still streaming; that time is not model time
+        for completion in (span for span in spans if span.category == "llm"):
+            for tool in (span for span in spans if span.category == "tool"):
+                overlap = min(completion.end, tool.end) - max(completion.start, tool.start)
+                totals["llm"] -= max(0.0, overlap)
+        other = max(0.0, turn.duration - sum(totals.values()))
+        parts = [f"{category} {seconds:.2f} s" for category, seconds in totals.items() if seconds]
+        parts.append(f"other {other:.2f} s")
+        tokens = ""
+        if "prompt_tokens" in turn.args:
+            tokens = f" ({turn.args['prompt_tokens']} prompt + {turn.args.get('completion_tokens', 0)} completion tokens)"
+        return f"Turn {turn.args.get('number', '?')}: {turn.duration:.2f} s = " + " + ".join(parts) + tokens
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Write all spans as complete events in the Chrome trace event format (loads in Perfetto)."""
+        tracks = {}
+        events = []
+        for span in sorted(self.spans, key=lambda span: span.start):
+            tid = tracks.setdefault(span.track, len(tracks) + 1)
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self._origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": span.args,
+            })
+        for track, tid in tracks.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": track}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+# Shared tracer of the process, enabled from the CLI.
+tracer = Tracer()
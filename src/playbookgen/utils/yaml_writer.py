@@ -5,6 +5,8 @@ from typing import Optional
 
 def extract_yaml_from_messages(message) -> Optional[str]:
     """Return YAML code block in assistant message."""
+    if not message:
+        return None
     pattern = re.compile(r"```yaml\n(.*?)```", re.DOTALL)
     match = pattern.search(message)
     if match: